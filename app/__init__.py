@@ -1,5 +1,6 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import Literal, Optional, Dict
 from datetime import datetime
@@ -15,12 +16,19 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Float,
-    ForeignKey
+    ForeignKey,
+    Index
 )
-from app.core.config import Base, SessionLocal, get_db, engine, local_engine
 
+# Nomes do app.core.config carregados no primeiro acesso: importar o pacote (app.core.importtime,
+# app.core.executor, testes) nao cria os engines; so modelos, routers e CRUDs que os usam.
+_CONFIG_EXPORTS = {"Base", "SessionLocal", "get_db", "get_async_db", "engine", "local_engine"}
+
+
+def __getattr__(name):
+    if name in _CONFIG_EXPORTS:
+        from app.core import config
+
+        return getattr(config, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def CreateDatabaseTables():
-    Base.metadata.create_all(bind=engine)
-    if local_engine is not None:
-        Base.metadata.create_all(bind=local_engine)
@@ -0,0 +1,146 @@
+import os
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.models.energy import Energy
+
+# Sem since/until a analise cobre os ultimos ANALYTICS_DEFAULT_WINDOW_DAYS dias; janelas
+# maiores que ANALYTICS_MAX_WINDOW_DAYS sao recusadas, para o custo nao crescer com o historico.
+ANALYTICS_DEFAULT_WINDOW_DAYS = float(os.getenv("ANALYTICS_DEFAULT_WINDOW_DAYS", "7"))
+ANALYTICS_MAX_WINDOW_DAYS = float(os.getenv("ANALYTICS_MAX_WINDOW_DAYS", "31"))
+
+_SERIES = ("timestamps", "generated", "consumed", "stored")
+
+
+def resolve_window(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    now: Optional[datetime] = None,
+) -> tuple[datetime, datetime]:
+    """Completa a janela com os padroes; ValueError se estiver invertida ou longa demais."""
+    default_span = timedelta(days=ANALYTICS_DEFAULT_WINDOW_DAYS)
+    if until is None:
+        until = since + default_span if since is not None else (now or datetime.now(timezone.utc))
+    if since is None:
+        since = until - default_span
+    since, until = _as_utc(since), _as_utc(until)
+    if since >= until:
+        raise ValueError("since must be earlier than until")
+    if until - since > timedelta(days=ANALYTICS_MAX_WINDOW_DAYS):
+        raise ValueError(f"window must not exceed {ANALYTICS_MAX_WINDOW_DAYS:g} days")
+    return since, until
+
+
+def _epoch_seconds(db: Session):
+    # Segundos Unix calculados no banco, ja como float: nada de datetime por linha no Python
+    if db.get_bind().dialect.name == "sqlite":
+        return (func.julianday(Energy.created_at) - 2440587.5) * 86400.0
+    return cast(func.extract("epoch", Energy.created_at), Float)
+
+
+def load_energy_window(db: Session, since: datetime, until: datetime) -> dict[str, np.ndarray]:
+    """
+    Carrega as colunas de uma janela de tempo como arrays NumPy (sem objetos ORM).
+
+    timestamps sao segundos Unix em float64. Use resolve_window para obter a janela.
+    """
+    statement = (
+        select(_epoch_seconds(db), Energy.energy_generated, Energy.energy_consumed, Energy.energy_stored)
+        .where(Energy.created_at >= since, Energy.created_at < until)
+        .order_by(Energy.created_at.asc(), Energy.id.asc())
+    )
+    rows = db.execute(statement).all()
+    matrix = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=len(rows) * len(_SERIES))
+    columns = matrix.reshape(len(rows), len(_SERIES)).T
+    return {name: np.ascontiguousarray(column) for name, column in zip(_SERIES, columns)}
+
+
+def _as_utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    if window <= 0 or values.size < window:
+        return np.empty(0, dtype=np.float64)
+    cumulative = np.cumsum(np.concatenate(([0.0], values)))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+
+def detect_peaks(values: np.ndarray, sigma: float = 2.0) -> np.ndarray:
+    """Indices de maximos locais acima de media + sigma * desvio padrao."""
+    if values.size < 3:
+        return np.empty(0, dtype=np.int64)
+    threshold = values.mean() + sigma * values.std()
+    middle = values[1:-1]
+    is_peak = (middle > values[:-2]) & (middle >= values[2:]) & (middle > threshold)
+    return np.flatnonzero(is_peak) + 1
+
+
+def downsample(values: np.ndarray, max_points: int) -> np.ndarray:
+    if max_points <= 0 or values.size <= max_points:
+        return values
+    step = int(np.ceil(values.size / max_points))
+    return values[::step]
+
+
+def compute_energy_metrics(
+    series: dict[str, np.ndarray],
+    window: int = 60,
+    peak_sigma: float = 2.0,
+    max_peaks: int = 20,
+    max_points: int = 500,
+) -> dict:
+    timestamps = series["timestamps"]
+    generated = series["generated"]
+    consumed = series["consumed"]
+
+    self_consumed = np.minimum(generated, consumed)
+    surplus = generated - consumed
+    total_generated = float(generated.sum())
+    total_consumed = float(consumed.sum())
+    total_self_consumed = float(self_consumed.sum())
+
+    peak_indices = detect_peaks(consumed, peak_sigma)
+    if peak_indices.size > max_peaks:
+        strongest = np.argsort(consumed[peak_indices])[::-1][:max_peaks]
+        peak_indices = np.sort(peak_indices[strongest])
+
+    rolling_generated = rolling_mean(generated, window)
+    rolling_consumed = rolling_mean(consumed, window)
+    rolling_timestamps = timestamps[window - 1:] if rolling_generated.size else rolling_generated
+
+    return {
+        "readings_count": int(generated.size),
+        "total_generated": total_generated,
+        "total_consumed": total_consumed,
+        "self_consumption_ratio": total_self_consumed / total_generated if total_generated > 0 else None,
+        "self_sufficiency_ratio": total_self_consumed / total_consumed if total_consumed > 0 else None,
+        "total_surplus": float(np.clip(surplus, 0, None).sum()),
+        "total_deficit": float(np.clip(-surplus, 0, None).sum()),
+        "peak_surplus": float(surplus.max()) if surplus.size else None,
+        "rolling_window": window,
+        "rolling": [
+            {
+                "timestamp": datetime.fromtimestamp(moment, tz=timezone.utc),
+                "generated_avg": float(gen_avg),
+                "consumed_avg": float(cons_avg),
+            }
+            for moment, gen_avg, cons_avg in zip(
+                downsample(rolling_timestamps, max_points),
+                downsample(rolling_generated, max_points),
+                downsample(rolling_consumed, max_points),
+            )
+        ],
+        "consumption_peaks": [
+            {
+                "timestamp": datetime.fromtimestamp(timestamps[index], tz=timezone.utc),
+                "energy_consumed": float(consumed[index]),
+            }
+            for index in peak_indices
+        ],
+    }
@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "30"))
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "256"))
+# Usuarios autenticados por subject do token; o TTL limita quanto tempo outro worker
+# ainda aceita um usuario removido ou com email alterado.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "4096"))
+# Ultima leitura de cada bateria; create_battery atualiza a copia do proprio worker e o TTL
+# limita o atraso dos demais.
+BATTERY_LATEST_CACHE_TTL_SECONDS = float(os.getenv("BATTERY_LATEST_CACHE_TTL_SECONDS", "5"))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Cache em memoria do processo com expiracao por TTL e despejo LRU por tamanho.
+
+    Cada worker tem a sua copia; o TTL limita quanto tempo um worker pode servir
+    um valor que outro worker ja invalidou.
+
+    Toda invalidacao avanca a geracao do cache. Quem carrega um valor le generation()
+    antes da consulta e passa para set: se houve invalidacao no meio, o valor carregado
+    pode ser anterior a escrita que invalidou e nao entra no cache.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+        self._generation = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, generation: int = None) -> bool:
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self.stale_sets += 1
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def get_or_set(self, key, factory):
+        generation = self.generation()
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key=_MISSING) -> None:
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self.invalidations += 1
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_sets": self.stale_sets,
+            }
+
+
+_caches = {}
+
+
+def register_cache(name: str, maxsize: int, ttl: float) -> TTLCache:
+    cache = TTLCache(name, maxsize, ttl)
+    _caches[name] = cache
+    return cache
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+building_dashboard_cache = register_cache(
+    "building_dashboard", DASHBOARD_CACHE_MAX_ENTRIES, DASHBOARD_CACHE_TTL_SECONDS
+)
+maintenance_dashboard_cache = register_cache(
+    "maintenance_dashboard", DASHBOARD_CACHE_MAX_ENTRIES, DASHBOARD_CACHE_TTL_SECONDS
+)
+principal_cache = register_cache(
+    "principal", PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS
+)
+# Uma entrada por BateryType; o tamanho so precisa cobrir o enum
+battery_latest_cache = register_cache("battery_latest", 64, BATTERY_LATEST_CACHE_TTL_SECONDS)
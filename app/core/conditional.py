@@ -0,0 +1,59 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+
+
+def watermark_statement(model, *version_columns):
+    """
+    SELECT barato que muda sempre que a tabela muda: contagem, maior id e maiores
+    valores das colunas de versao (created_at, updated_at, ...).
+    """
+    return select(
+        func.count(model.id),
+        func.max(model.id),
+        *[func.max(column) for column in version_columns],
+    )
+
+
+def _as_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def build_validators(watermark, variant: str = "") -> tuple[str, Optional[datetime]]:
+    values = tuple(watermark)
+    digest = hashlib.sha1(repr((values, variant)).encode("utf-8")).hexdigest()
+    moments = [_as_utc(value) for value in values if isinstance(value, datetime)]
+    return f'W/"{digest}"', max(moments) if moments else None
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    expected = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == expected for tag in if_none_match.split(","))
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime]) -> None:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
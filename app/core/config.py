@@ -1,16 +1,54 @@
 import os
+import atexit
 import json
 import importlib
 import logging
-from datetime import date, datetime
+import uuid
+from datetime import date, datetime, timedelta, timezone
 from enum import Enum
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    and_,
+    bindparam,
+    case,
+    create_engine,
+    delete,
+    event,
+    exists,
+    func,
+    insert,
+    inspect,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.sql.sqltypes import Boolean as SQLBoolean
 from sqlalchemy.sql.sqltypes import Date as SQLDate
 from sqlalchemy.sql.sqltypes import DateTime as SQLDateTime
 from sqlalchemy.sql.sqltypes import Enum as SQLEnum
+from sqlalchemy.sql.sqltypes import Float as SQLFloat
+from sqlalchemy.sql.sqltypes import Integer as SQLInteger
+from sqlalchemy.sql.sqltypes import JSON as SQLJSON
+from sqlalchemy.sql.sqltypes import String as SQLString
+
+from app.core.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, register_engine
+from app.core.replication import BackgroundReplicator, register_replicator
 
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -45,6 +83,61 @@ logger = logging.getLogger(__name__)
 SYNC_QUEUE_TABLE = "_offline_sync_queue"
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+# Pool de conexoes
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# PgBouncer em pool_mode=transaction: sem parametros de inicializacao nem prepared statements
+DB_PGBOUNCER_TRANSACTION_MODE = _env_bool("DB_PGBOUNCER_TRANSACTION_MODE", False)
+
+POOL_SETTINGS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+    "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS,
+    "pgbouncer_transaction_mode": DB_PGBOUNCER_TRANSACTION_MODE,
+}
+
+# Banco secundario (replica local e fila offline). Vazio desativa; sqlite:///caminho.db usa o
+# armazenamento embarcado dos gateways de borda, postgresql://... um Postgres local.
+SECONDARY_DATABASE_URL = os.getenv("SECONDARY_DATABASE_URL", "").strip()
+if SECONDARY_DATABASE_URL.startswith("postgres://"):
+    SECONDARY_DATABASE_URL = SECONDARY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Replicacao para o banco local: "sync" aplica dentro do request, "async" numa thread de fundo.
+# No SQLite o padrao e "async": a thread agrupa varios commits numa transacao so.
+DB_REPLICATION_MODE = os.getenv("DB_REPLICATION_MODE", "").strip().lower() or (
+    "async" if SECONDARY_DATABASE_URL.startswith("sqlite") else "sync"
+)
+DB_REPLICATION_QUEUE_SIZE = int(os.getenv("DB_REPLICATION_QUEUE_SIZE", "1000"))
+DB_REPLICATION_BATCH_SIZE = int(os.getenv("DB_REPLICATION_BATCH_SIZE", "50"))
+DB_REPLICATION_ENQUEUE_TIMEOUT = float(os.getenv("DB_REPLICATION_ENQUEUE_TIMEOUT", "0.5"))
+DB_REPLICATION_LAG_WARNING_SECONDS = float(os.getenv("DB_REPLICATION_LAG_WARNING_SECONDS", "5"))
+
+# Fila offline: desligue a drenagem no request quando houver workers (python -m app.core.sync_worker)
+SYNC_QUEUE_DRAIN_IN_REQUEST = _env_bool("SYNC_QUEUE_DRAIN_IN_REQUEST", True)
+SYNC_RETRY_BASE_SECONDS = float(os.getenv("SYNC_RETRY_BASE_SECONDS", "5"))
+SYNC_RETRY_MAX_SECONDS = float(os.getenv("SYNC_RETRY_MAX_SECONDS", "900"))
+# Pendencia mais antiga acima deste limite marca a sincronizacao como atrasada em /logs/sync
+SYNC_LAG_ALERT_SECONDS = float(os.getenv("SYNC_LAG_ALERT_SECONDS", "300"))
+
+# Migracoes rodam fora do boot (python -m app.core.migrations); true aplica no startup do app
+DB_AUTO_MIGRATE = _env_bool("DB_AUTO_MIGRATE", False)
+
+
 def _is_local_postgres(url: str) -> bool:
     parsed = make_url(url)
     if not parsed.drivername.startswith("postgresql"):
@@ -52,44 +145,182 @@ def _is_local_postgres(url: str) -> bool:
     return parsed.host in {"localhost", "127.0.0.1"}
 
 
+def _pool_kwargs(poolclass) -> dict:
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _set_local_statement_timeout(sync_engine):
+    # Em modo transacao do PgBouncer o SET precisa valer so para a transacao corrente.
+    @event.listens_for(sync_engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+
+
 def _create_db_engine(url: str):
     connect_args = {"sslmode": "require"} if not _is_local_postgres(url) else {}
-    return create_engine(url, pool_pre_ping=True, connect_args=connect_args)
+    if DB_STATEMENT_TIMEOUT_MS > 0 and not DB_PGBOUNCER_TRANSACTION_MODE:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    db_engine = create_engine(url, connect_args=connect_args, **_pool_kwargs(InstrumentedQueuePool))
+    if DB_STATEMENT_TIMEOUT_MS > 0 and DB_PGBOUNCER_TRANSACTION_MODE:
+        _set_local_statement_timeout(db_engine)
+    return db_engine
+
+
+def _async_database_url(url: str):
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        return parsed
+    # asyncpg nao entende sslmode na URL; o SSL vai em connect_args.
+    parsed = parsed.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+    if DB_PGBOUNCER_TRANSACTION_MODE:
+        parsed = parsed.update_query_dict({"prepared_statement_cache_size": "0"})
+    return parsed
+
+
+def _create_async_db_engine(url: str):
+    connect_args = {"ssl": "require"} if not _is_local_postgres(url) else {}
+    if DB_PGBOUNCER_TRANSACTION_MODE:
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    elif DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+    db_engine = create_async_engine(
+        _async_database_url(url),
+        connect_args=connect_args,
+        **_pool_kwargs(InstrumentedAsyncQueuePool),
+    )
+    if DB_STATEMENT_TIMEOUT_MS > 0 and DB_PGBOUNCER_TRANSACTION_MODE:
+        _set_local_statement_timeout(db_engine.sync_engine)
+    return db_engine
+
+
+def _set_sqlite_pragmas(sync_engine):
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL: leituras nao bloqueiam a escrita; NORMAL so sincroniza o disco nos checkpoints
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
+def _create_sqlite_engine(url: str):
+    parsed = make_url(url)
+    if parsed.database and parsed.database != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(parsed.database)), exist_ok=True)
+    db_engine = create_engine(parsed, connect_args={"check_same_thread": False})
+    _set_sqlite_pragmas(db_engine)
+    return db_engine
+
+
+def _create_secondary_engine(url: str):
+    if not url:
+        return None
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return _create_sqlite_engine(url)
+    if backend == "postgresql":
+        return _create_db_engine(url)
+    raise RuntimeError(f"Banco secundario nao suportado: {backend}")
 
 
 # Engine principal (local no dev, remoto em prod)
 engine = _create_db_engine(PRIMARY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+register_engine("primary", engine, POOL_SETTINGS)
 
-# Engine secundário desativado por padrão
-local_engine = None
+# Engine assincrono do banco principal, criado no primeiro uso (somente leitura nas rotas quentes)
+async_engine = None
+AsyncSessionLocal = None
+
+# Engine secundario, desativado sem SECONDARY_DATABASE_URL
+local_engine = _create_secondary_engine(SECONDARY_DATABASE_URL)
+if local_engine is not None:
+    register_engine("local", local_engine, {"backend": local_engine.dialect.name})
 LocalSessionLocal = (
     sessionmaker(autocommit=False, autoflush=False, bind=local_engine, expire_on_commit=False)
     if local_engine is not None
     else None
 )
 
-Base = declarative_base()
+class _ModelDefaults:
+    # Colunas geradas no servidor (id, created_at) voltam no proprio INSERT via RETURNING,
+    # entao nao e preciso db.refresh depois do commit.
+    __mapper_args__ = {"eager_defaults": True}
+
+
+Base = declarative_base(cls=_ModelDefaults)
+
+
+_queue_metadata = MetaData()
+_QueueJSON = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+_pending = text("synced_at IS NULL")
+
+# Fila de pendencias offline; tipos com variantes para rodar no Postgres local ou no SQLite
+sync_queue = Table(
+    SYNC_QUEUE_TABLE,
+    _queue_metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("model_key", Text, nullable=False),
+    Column("operation", String(10), nullable=False),
+    Column("pk_values", _QueueJSON),
+    Column("payload", _QueueJSON),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("last_error", Text),
+    Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Column("synced_at", DateTime(timezone=True)),
+    Column("next_attempt_at", DateTime(timezone=True)),
+    Column("pk_key", Text),
+    Index(
+        f"ix{SYNC_QUEUE_TABLE}_pending",
+        "next_attempt_at",
+        "id",
+        postgresql_where=_pending,
+        sqlite_where=_pending,
+    ),
+    Index(
+        f"ix{SYNC_QUEUE_TABLE}_pending_pk",
+        "model_key",
+        "pk_key",
+        postgresql_where=_pending,
+        sqlite_where=_pending,
+    ),
+    Index(
+        f"ix{SYNC_QUEUE_TABLE}_synced_at",
+        "synced_at",
+        postgresql_where=text("synced_at IS NOT NULL"),
+        sqlite_where=text("synced_at IS NOT NULL"),
+    ),
+)
 
 
-def _ensure_sync_queue_table():
-    if local_engine is None:
-        return
-    create_stmt = f"""
-    CREATE TABLE IF NOT EXISTS {SYNC_QUEUE_TABLE} (
-        id BIGSERIAL PRIMARY KEY,
-        model_key TEXT NOT NULL,
-        operation VARCHAR(10) NOT NULL,
-        pk_values JSONB,
-        payload JSONB,
-        attempts INTEGER NOT NULL DEFAULT 0,
-        last_error TEXT,
-        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-        synced_at TIMESTAMPTZ
-    )
-    """
-    with local_engine.begin() as conn:
-        conn.execute(text(create_stmt))
+def _ensure_sync_queue_table(conn):
+    """Cria ou atualiza a fila offline. Chamado pelas migracoes (app.core.migrations)."""
+    sync_queue.create(conn, checkfirst=True)
+    if conn.dialect.name == "postgresql":
+        # Filas criadas antes do backoff e da coalescencia nao tem as colunas
+        for column_ddl in ("next_attempt_at TIMESTAMPTZ", "pk_key TEXT"):
+            conn.execute(
+                text(f"ALTER TABLE {SYNC_QUEUE_TABLE} ADD COLUMN IF NOT EXISTS {column_ddl}")
+            )
+    for index in sync_queue.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _sync_retry_at(attempts: int) -> datetime:
+    """Proxima tentativa com backoff exponencial (5s, 10s, 20s... ate SYNC_RETRY_MAX_SECONDS)."""
+    delay = min(SYNC_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), SYNC_RETRY_MAX_SECONDS)
+    return datetime.now(timezone.utc) + timedelta(seconds=delay)
 
 
 def _model_key(model_cls) -> str:
@@ -148,34 +379,113 @@ def _pk_values_from_instance(instance, mapper):
     return [getattr(instance, col.key, None) for col in mapper.primary_key]
 
 
+def _serialize_enum(value):
+    return value.name if isinstance(value, Enum) else str(value)
+
+
+def _serialize_temporal(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _column_serializer(column):
+    """Funcao de serializacao da coluna, ou None quando o valor vai para o JSON como esta."""
+    if isinstance(column.type, SQLEnum):
+        return _serialize_enum
+    if isinstance(column.type, (SQLDateTime, SQLDate)):
+        return _serialize_temporal
+    if isinstance(column.type, _PASSTHROUGH_TYPES):
+        return None
+    return lambda value: _serialize_for_column(value, column)
+
+
+def _column_deserializer(column):
+    if isinstance(column.type, SQLEnum):
+        enum_class = getattr(column.type, "enum_class", None)
+        if enum_class is None:
+            return None
+        return lambda value: _deserialize_for_column(value, column)
+    if isinstance(column.type, SQLDateTime):
+        return lambda value: datetime.fromisoformat(value) if isinstance(value, str) else value
+    if isinstance(column.type, SQLDate):
+        return lambda value: date.fromisoformat(value) if isinstance(value, str) else value
+    return None
+
+
+class _MapperPlan:
+    """
+    Colunas de um modelo com as funcoes de (de)serializacao ja escolhidas.
+
+    Montado uma vez por classe: o snapshot de cada commit vira um loop sobre tuplas,
+    sem percorrer mapper.columns nem testar o tipo de cada coluna por objeto.
+    """
+
+    __slots__ = ("model_key", "keys", "pk_keys", "serializers", "deserializers")
+
+    def __init__(self, model_cls):
+        mapper = inspect(model_cls).mapper
+        columns = list(mapper.columns)
+        self.model_key = _model_key(model_cls)
+        self.keys = tuple(col.key for col in columns)
+        self.pk_keys = tuple(col.key for col in mapper.primary_key)
+        self.serializers = tuple((col.key, _column_serializer(col)) for col in columns)
+        self.deserializers = tuple((col.key, _column_deserializer(col)) for col in columns)
+
+    def pk_values(self, obj) -> list:
+        return [getattr(obj, key, None) for key in self.pk_keys]
+
+    def serialize(self, obj) -> dict:
+        # Valores carregados ficam no __dict__ da instancia; getattr so para os ausentes
+        state = obj.__dict__
+        payload = {}
+        for key, serializer in self.serializers:
+            value = state[key] if key in state else getattr(obj, key)
+            payload[key] = value if serializer is None or value is None else serializer(value)
+        return payload
+
+    def deserialize(self, payload: dict) -> dict:
+        values = {}
+        for key, deserializer in self.deserializers:
+            if key in payload:
+                value = payload[key]
+                values[key] = value if deserializer is None or value is None else deserializer(value)
+        return values
+
+
+_PASSTHROUGH_TYPES = (SQLBoolean, SQLFloat, SQLInteger, SQLJSON, SQLString)
+_mapper_plans = {}
+
+
+def _mapper_plan(model_cls) -> _MapperPlan:
+    plan = _mapper_plans.get(model_cls)
+    if plan is None:
+        plan = _mapper_plans[model_cls] = _MapperPlan(model_cls)
+    return plan
+
+
 def _snapshot_operations(session):
     operations = []
 
     for obj in list(session.new) + list(session.dirty):
-        mapper = inspect(obj).mapper
-        payload = {
-            col.key: _serialize_for_column(getattr(obj, col.key), col)
-            for col in mapper.columns
-        }
+        plan = _mapper_plan(obj.__class__)
         operations.append(
             {
                 "operation": "upsert",
                 "model_class": obj.__class__,
-                "model_key": _model_key(obj.__class__),
-                "pk_values": _pk_values_from_instance(obj, mapper),
-                "payload": payload,
+                "model_key": plan.model_key,
+                "pk_values": plan.pk_values(obj),
+                "payload": plan.serialize(obj),
                 "source_obj": obj,
             }
         )
 
     for obj in list(session.deleted):
-        mapper = inspect(obj).mapper
+        plan = _mapper_plan(obj.__class__)
         operations.append(
             {
                 "operation": "delete",
                 "model_class": obj.__class__,
-                "model_key": _model_key(obj.__class__),
-                "pk_values": _pk_values_from_instance(obj, mapper),
+                "model_key": plan.model_key,
+                "pk_values": plan.pk_values(obj),
                 "payload": None,
                 "source_obj": None,
             }
@@ -190,18 +500,14 @@ def _refresh_operations_from_source(operations):
         if source_obj is None or op["operation"] != "upsert":
             continue
 
-        mapper = inspect(source_obj).mapper
-        op["pk_values"] = _pk_values_from_instance(source_obj, mapper)
-        op["payload"] = {
-            col.key: _serialize_for_column(getattr(source_obj, col.key), col)
-            for col in mapper.columns
-        }
+        plan = _mapper_plan(source_obj.__class__)
+        op["pk_values"] = plan.pk_values(source_obj)
+        op["payload"] = plan.serialize(source_obj)
 
 
 def _sync_source_object(source_obj, persisted_obj):
-    mapper = inspect(source_obj).mapper
-    for col in mapper.columns:
-        setattr(source_obj, col.key, getattr(persisted_obj, col.key))
+    for key in _mapper_plan(source_obj.__class__).keys:
+        setattr(source_obj, key, getattr(persisted_obj, key))
 
 
 def _pk_identity(pk_values):
@@ -212,81 +518,346 @@ def _pk_identity(pk_values):
     return pk_values[0] if len(pk_values) == 1 else tuple(pk_values)
 
 
+# Tamanho maximo da lista do IN ao pre-carregar linhas existentes
+PREFETCH_CHUNK_SIZE = 1000
+
+
+def _prefetch_existing(session, operations):
+    """
+    Carrega com uma consulta IN por modelo (em blocos) as linhas que as operacoes tocam.
+
+    Substitui um session.get por operacao; chaves ausentes do dicionario nao existem no banco.
+    """
+    identities = {}
+    for op in operations:
+        identity = _pk_identity(op["pk_values"])
+        if identity is not None:
+            identities.setdefault(op["model_class"], set()).add(identity)
+
+    existing = {}
+    for model_cls, keys in identities.items():
+        plan = _mapper_plan(model_cls)
+        pk_columns = inspect(model_cls).mapper.primary_key
+        keys = list(keys)
+        for start in range(0, len(keys), PREFETCH_CHUNK_SIZE):
+            chunk = keys[start:start + PREFETCH_CHUNK_SIZE]
+            if len(pk_columns) == 1:
+                condition = pk_columns[0].in_(chunk)
+            else:
+                condition = tuple_(*pk_columns).in_(chunk)
+            for obj in session.scalars(select(model_cls).where(condition)):
+                identity = _pk_identity(plan.pk_values(obj))
+                existing[(model_cls, identity)] = obj
+    return existing
+
+
 def _apply_operations(session, operations, copy_back_to_source=False):
     persisted = []
+    existing = _prefetch_existing(session, operations)
 
     for op in operations:
         model_cls = op["model_class"]
-        mapper = inspect(model_cls).mapper
         identity = _pk_identity(op["pk_values"])
 
         if op["operation"] == "upsert":
-            target = session.get(model_cls, identity) if identity is not None else None
+            target = existing.get((model_cls, identity)) if identity is not None else None
             if target is None:
                 target = model_cls()
                 session.add(target)
+                if identity is not None:
+                    existing[(model_cls, identity)] = target
 
-            for col in mapper.columns:
-                if col.key in op["payload"]:
-                    setattr(target, col.key, _deserialize_for_column(op["payload"][col.key], col))
+            for key, value in _mapper_plan(model_cls).deserialize(op["payload"]).items():
+                setattr(target, key, value)
             persisted.append((op, target))
             continue
 
         if op["operation"] == "delete" and identity is not None:
-            target = session.get(model_cls, identity)
-            if target is not None:
+            target = existing.pop((model_cls, identity), None)
+            if target is not None and inspect(target).pending:
+                # Inserida e apagada no mesmo lote: basta nao inserir
+                session.expunge(target)
+            elif target is not None:
                 session.delete(target)
 
     session.commit()
 
     for op, obj in persisted:
-        mapper = inspect(obj).mapper
-        op["pk_values"] = _pk_values_from_instance(obj, mapper)
-        op["payload"] = {
-            col.key: _serialize_for_column(getattr(obj, col.key), col)
-            for col in mapper.columns
-        }
+        plan = _mapper_plan(obj.__class__)
+        op["pk_values"] = plan.pk_values(obj)
+        op["payload"] = plan.serialize(obj)
         if copy_back_to_source and op.get("source_obj") is not None:
             _sync_source_object(op["source_obj"], obj)
 
 
+def _pk_key(pk_values):
+    """Chave canonica da linha na fila; None quando a chave primaria ainda nao e conhecida."""
+    if _pk_identity(pk_values) is None:
+        return None
+    return json.dumps(pk_values, separators=(",", ":"), default=str)
+
+
 def _queue_operations_for_sync(session, operations, last_error: str):
-    insert_stmt = text(
-        f"""
-        INSERT INTO {SYNC_QUEUE_TABLE} (model_key, operation, pk_values, payload, attempts, last_error)
-        VALUES (:model_key, :operation, CAST(:pk_values AS JSONB), CAST(:payload AS JSONB), 0, :last_error)
-        """
-    )
-    for op in operations:
+    """
+    Enfileira as operacoes coalescendo as pendencias da mesma linha (model_key, pk_key).
+
+    A pendencia mais antiga da linha recebe o estado novo no proprio lugar: a replay aplica
+    so o ultimo estado de cada linha, mas na posicao da primeira escrita. Mover a linha
+    para o fim da fila poria um pai reescrito atras de um filho ja enfileirado (violacao de
+    FK na replay), e created_at continua marcando ha quanto tempo a linha esta pendente.
+    """
+    latest = {}
+    for index, op in enumerate(operations):
+        pk_key = _pk_key(op["pk_values"])
+        key = (op["model_key"], pk_key) if pk_key is not None else ("", index)
+        # Chave repetida no lote: troca o estado e mantem a posicao da primeira ocorrencia
+        latest[key] = (op, pk_key)
+
+    keys = [(model_key, pk_key) for (model_key, pk_key), (_, key) in latest.items() if key is not None]
+    queued = {}
+    duplicates = []
+    for start in range(0, len(keys), PREFETCH_CHUNK_SIZE):
+        rows = session.execute(
+            select(sync_queue.c.id, sync_queue.c.model_key, sync_queue.c.pk_key)
+            .where(
+                sync_queue.c.synced_at.is_(None),
+                tuple_(sync_queue.c.model_key, sync_queue.c.pk_key).in_(keys[start:start + PREFETCH_CHUNK_SIZE]),
+            )
+            .order_by(sync_queue.c.id)
+        ).all()
+        for queue_id, model_key, pk_key in rows:
+            if (model_key, pk_key) in queued:
+                duplicates.append(queue_id)
+            else:
+                queued[(model_key, pk_key)] = queue_id
+    if duplicates:
+        session.execute(delete(sync_queue).where(sync_queue.c.id.in_(duplicates)))
+
+    new_rows = []
+    for key, (op, pk_key) in latest.items():
+        values = {
+            "operation": op["operation"],
+            "pk_values": op["pk_values"],
+            "payload": op["payload"],
+            "last_error": last_error[:1000],
+        }
+        queue_id = queued.get(key) if pk_key is not None else None
+        if queue_id is not None:
+            # synced_at IS NULL: se um worker acabou de sincronizar a pendencia antiga,
+            # o UPDATE nao acha a linha e o estado novo entra como pendencia nova.
+            updated = session.execute(
+                update(sync_queue)
+                .where(sync_queue.c.id == queue_id, sync_queue.c.synced_at.is_(None))
+                .values(next_attempt_at=None, **values)
+            ).rowcount
+            if updated:
+                continue
+        new_rows.append({**values, "model_key": op["model_key"], "attempts": 0, "pk_key": pk_key})
+
+    if new_rows:
+        session.execute(insert(sync_queue), new_rows)
+    session.commit()
+
+
+def _compact_sync_queue(session) -> dict:
+    """
+    Junta pendencias duplicadas da mesma linha na mais antiga.
+
+    A mais antiga recebe o estado da mais nova e as demais sao apagadas, mantendo a posicao
+    na fila e o created_at da primeira escrita (ver _queue_operations_for_sync). Tambem
+    preenche pk_key das linhas enfileiradas antes da coalescencia. Linhas travadas por um
+    worker esperam o fim do lote dele; se ja foram sincronizadas, ficam como estao.
+    """
+    legacy = session.execute(
+        select(sync_queue.c.id, sync_queue.c.pk_values).where(
+            sync_queue.c.synced_at.is_(None),
+            sync_queue.c.pk_key.is_(None),
+            sync_queue.c.pk_values.isnot(None),
+        )
+    ).all()
+    keyed = []
+    for row_id, pk_values in legacy:
+        pk_key = _pk_key(pk_values)
+        if pk_key is not None:
+            keyed.append({"queue_id": row_id, "pk_key": pk_key})
+    if keyed:
         session.execute(
-            insert_stmt,
-            {
-                "model_key": op["model_key"],
-                "operation": op["operation"],
-                "pk_values": json.dumps(op["pk_values"]),
-                "payload": json.dumps(op["payload"]) if op["payload"] is not None else None,
-                "last_error": last_error[:1000],
-            },
+            update(sync_queue)
+            .where(sync_queue.c.id == bindparam("queue_id"))
+            .values(pk_key=bindparam("pk_key")),
+            keyed,
+        )
+
+    def same_row(other):
+        return and_(
+            other.c.synced_at.is_(None),
+            other.c.model_key == sync_queue.c.model_key,
+            other.c.pk_key == sync_queue.c.pk_key,
+        )
+
+    newer = sync_queue.alias("newer")
+    newest = sync_queue.alias("newest")
+
+    def newest_value(column):
+        return (
+            select(newest.c[column])
+            .where(same_row(newest))
+            .order_by(newest.c.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    session.execute(
+        update(sync_queue)
+        .where(
+            sync_queue.c.synced_at.is_(None),
+            sync_queue.c.pk_key.isnot(None),
+            exists().where(same_row(newer), newer.c.id > sync_queue.c.id),
+        )
+        .values(
+            operation=newest_value("operation"),
+            pk_values=newest_value("pk_values"),
+            payload=newest_value("payload"),
+        )
+    )
+
+    older = sync_queue.alias("older")
+    removed = session.execute(
+        delete(sync_queue).where(
+            sync_queue.c.synced_at.is_(None),
+            sync_queue.c.pk_key.isnot(None),
+            exists().where(same_row(older), older.c.id < sync_queue.c.id),
         )
+    ).rowcount
     session.commit()
+    return {"keyed": len(keyed), "removed": removed}
+
+
+def _age_seconds(moment, now: datetime):
+    if moment is None:
+        return None
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return round(max((now - moment).total_seconds(), 0.0), 3)
+
+
+def sync_queue_status() -> dict:
+    """
+    Estado da fila offline para monitoramento: backlog por modelo, idade da pendencia mais
+    antiga, histograma de tentativas, ultimo erro e taxa de replay.
+
+    A idade vem de created_at, que e a primeira escrita pendente da linha: a coalescencia
+    atualiza a pendencia no lugar, entao reescrever a mesma linha durante uma queda nao
+    zera o atraso.
+
+    Todas as consultas usam os indices parciais da fila (pendentes ou sincronizadas).
+    """
+    if local_engine is None:
+        return {"enabled": False, "status": "disabled"}
+
+    now = datetime.now(timezone.utc)
+    queue = sync_queue.c
+    is_pending = queue.synced_at.is_(None)
+    bucket = case(
+        (queue.attempts == 0, "0"),
+        (queue.attempts <= 2, "1-2"),
+        (queue.attempts <= 5, "3-5"),
+        else_="6+",
+    ).label("bucket")
+
+    with local_engine.connect() as conn:
+        backlog_rows = conn.execute(
+            select(
+                queue.model_key,
+                func.count().label("pending"),
+                func.min(queue.created_at).label("oldest"),
+                func.sum(case((queue.next_attempt_at > now, 1), else_=0)).label("deferred"),
+            )
+            .where(is_pending)
+            .group_by(queue.model_key)
+        ).mappings().all()
+
+        attempts_rows = conn.execute(
+            select(bucket, func.count()).where(is_pending).group_by(bucket)
+        ).all()
+
+        last_error = conn.execute(
+            select(queue.id, queue.model_key, queue.attempts, queue.last_error, queue.next_attempt_at)
+            .where(is_pending, queue.last_error.isnot(None))
+            .order_by(queue.id.desc())
+            .limit(1)
+        ).mappings().first()
+
+        replay_rows = conn.execute(
+            select(
+                func.sum(case((queue.synced_at >= now - timedelta(minutes=1), 1), else_=0)).label(
+                    "last_minute"
+                ),
+                func.count().label("last_15_minutes"),
+                func.max(queue.synced_at).label("last_synced_at"),
+            ).where(queue.synced_at >= now - timedelta(minutes=15))
+        ).mappings().first()
+
+    pending = sum(row["pending"] for row in backlog_rows)
+    oldest_age = max(
+        (_age_seconds(row["oldest"], now) for row in backlog_rows if row["oldest"] is not None),
+        default=None,
+    )
+    histogram = {bucket: 0 for bucket in ("0", "1-2", "3-5", "6+")}
+    histogram.update({bucket: total for bucket, total in attempts_rows})
+    synced_15m = replay_rows["last_15_minutes"] or 0
+
+    return {
+        "enabled": True,
+        "status": "lagging" if oldest_age is not None and oldest_age > SYNC_LAG_ALERT_SECONDS else "ok",
+        "lag_alert_seconds": SYNC_LAG_ALERT_SECONDS,
+        "pending": pending,
+        "deferred": sum(row["deferred"] or 0 for row in backlog_rows),
+        "oldest_pending_age_seconds": oldest_age,
+        "attempts_histogram": histogram,
+        "backlog_by_model": {
+            row["model_key"]: {
+                "pending": row["pending"],
+                "oldest_pending_age_seconds": _age_seconds(row["oldest"], now),
+            }
+            for row in sorted(backlog_rows, key=lambda row: row["pending"], reverse=True)
+        },
+        "last_error": (
+            {
+                "queue_id": last_error["id"],
+                "model_key": last_error["model_key"],
+                "attempts": last_error["attempts"],
+                "error": last_error["last_error"],
+                "next_attempt_at": last_error["next_attempt_at"],
+            }
+            if last_error is not None
+            else None
+        ),
+        "replay": {
+            "synced_last_minute": replay_rows["last_minute"] or 0,
+            "synced_last_15_minutes": synced_15m,
+            "rate_per_second_15m": round(synced_15m / 900, 3),
+            "last_synced_age_seconds": _age_seconds(replay_rows["last_synced_at"], now),
+        },
+    }
 
 
 def _drain_sync_queue(primary_session, secondary_session, limit=100):
     if secondary_session is None:
         return
 
+    queue = sync_queue.c
     rows = (
         secondary_session.execute(
-            text(
-                f"""
-                SELECT id, model_key, operation, pk_values, payload, attempts
-                FROM {SYNC_QUEUE_TABLE}
-                WHERE synced_at IS NULL
-                ORDER BY id ASC
-                LIMIT :limit
-                """
-            ),
-            {"limit": limit},
+            select(queue.id, queue.model_key, queue.operation, queue.pk_values, queue.payload, queue.attempts)
+            .where(
+                queue.synced_at.is_(None),
+                or_(queue.next_attempt_at.is_(None), queue.next_attempt_at <= datetime.now(timezone.utc)),
+            )
+            .order_by(queue.id)
+            .limit(limit)
         )
         .mappings()
         .all()
@@ -306,41 +877,59 @@ def _drain_sync_queue(primary_session, secondary_session, limit=100):
             _apply_operations(primary_session, [op], copy_back_to_source=False)
 
             secondary_session.execute(
-                text(
-                    f"""
-                    UPDATE {SYNC_QUEUE_TABLE}
-                    SET synced_at = NOW(), last_error = NULL
-                    WHERE id = :id
-                    """
-                ),
-                {"id": row["id"]},
+                update(sync_queue)
+                .where(queue.id == row["id"])
+                .values(synced_at=datetime.now(timezone.utc), last_error=None)
             )
             secondary_session.commit()
         except Exception as exc:
             primary_session.rollback()
             secondary_session.execute(
-                text(
-                    f"""
-                    UPDATE {SYNC_QUEUE_TABLE}
-                    SET attempts = :attempts, last_error = :last_error
-                    WHERE id = :id
-                    """
-                ),
-                {
-                    "id": row["id"],
-                    "attempts": int(row["attempts"]) + 1,
-                    "last_error": str(exc)[:1000],
-                },
+                update(sync_queue)
+                .where(queue.id == row["id"])
+                .values(
+                    attempts=int(row["attempts"]) + 1,
+                    last_error=str(exc)[:1000],
+                    next_attempt_at=_sync_retry_at(int(row["attempts"]) + 1),
+                )
             )
             secondary_session.commit()
             logger.exception("Falha ao sincronizar pendencia %s com a nuvem.", row["id"])
             break
 
 
-try:
-    _ensure_sync_queue_table()
-except Exception:
-    logger.exception("Nao foi possivel inicializar a fila de sincronizacao offline.")
+def _replicate_batch(operations):
+    secondary_db = LocalSessionLocal()
+    primary_db = SessionLocal()
+    try:
+        try:
+            _apply_operations(secondary_db, operations, copy_back_to_source=False)
+        except Exception:
+            secondary_db.rollback()
+            raise
+
+        if SYNC_QUEUE_DRAIN_IN_REQUEST:
+            try:
+                _drain_sync_queue(primary_db, secondary_db)
+            except Exception:
+                logger.exception("Falha ao processar fila de pendencias offline.")
+    finally:
+        primary_db.close()
+        secondary_db.close()
+
+
+replicator = None
+if local_engine is not None and DB_REPLICATION_MODE == "async":
+    replicator = BackgroundReplicator(
+        "local",
+        _replicate_batch,
+        maxsize=DB_REPLICATION_QUEUE_SIZE,
+        batch_size=DB_REPLICATION_BATCH_SIZE,
+        enqueue_timeout=DB_REPLICATION_ENQUEUE_TIMEOUT,
+        lag_warning_seconds=DB_REPLICATION_LAG_WARNING_SECONDS,
+    )
+    register_replicator(replicator)
+    atexit.register(replicator.stop)
 
 
 class DualWriteSession:
@@ -368,8 +957,7 @@ class DualWriteSession:
             if self.secondary is None:
                 raise
 
-            mapper = inspect(instance).mapper
-            pk_values = _pk_values_from_instance(instance, mapper)
+            pk_values = _mapper_plan(instance.__class__).pk_values(instance)
             identity = _pk_identity(pk_values)
             if identity is None:
                 raise
@@ -392,29 +980,20 @@ class DualWriteSession:
             self.secondary.close()
 
     def commit(self):
+        if self.secondary is None:
+            # Sem banco local nao ha replica nem fila offline: o snapshot seria descartado.
+            return self.primary.commit()
+
         operations = _snapshot_operations(self.primary)
         try:
             self.primary.commit()
-            _refresh_operations_from_source(operations)
-
-            if self.secondary is not None:
-                try:
-                    _apply_operations(self.secondary, operations, copy_back_to_source=False)
-                except Exception:
-                    self.secondary.rollback()
-                    logger.exception("Falha ao sincronizar escrita no banco local.")
-
-                try:
-                    _drain_sync_queue(self.primary, self.secondary)
-                except Exception:
-                    logger.exception("Falha ao processar fila de pendencias offline.")
-
         except Exception as cloud_error:
             self.primary.rollback()
-            if self.secondary is None:
-                raise
-
             try:
+                # Commits anteriores ainda na fila da replicacao sao mais velhos que esta
+                # escrita; aplicados depois dela, sobrescreveriam a linha com dados antigos.
+                if replicator is not None:
+                    replicator.flush()
                 _apply_operations(self.secondary, operations, copy_back_to_source=True)
                 _queue_operations_for_sync(self.secondary, operations, str(cloud_error))
                 logger.warning(
@@ -423,6 +1002,26 @@ class DualWriteSession:
             except Exception:
                 self.secondary.rollback()
                 raise
+            return
+
+        # Daqui em diante a escrita ja esta no principal: uma falha na copia local e so logada,
+        # nunca enfileirada como pendencia offline (seria reaplicada no principal).
+        try:
+            _refresh_operations_from_source(operations)
+            # Fila cheia: submit espera vaga; aplicar aqui passaria na frente dos lotes na fila
+            if replicator is not None:
+                replicator.submit(operations)
+            else:
+                _apply_operations(self.secondary, operations, copy_back_to_source=False)
+        except Exception:
+            self.secondary.rollback()
+            logger.exception("Falha ao sincronizar escrita no banco local.")
+
+        if replicator is None and SYNC_QUEUE_DRAIN_IN_REQUEST:
+            try:
+                _drain_sync_queue(self.primary, self.secondary)
+            except Exception:
+                logger.exception("Falha ao processar fila de pendencias offline.")
 
     def __getattr__(self, item):
         return getattr(self.primary, item)
@@ -436,3 +1035,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_async_engine():
+    global async_engine, AsyncSessionLocal
+    if async_engine is None:
+        async_engine = _create_async_db_engine(PRIMARY_DATABASE_URL)
+        register_engine("primary_async", async_engine.sync_engine, POOL_SETTINGS)
+        AsyncSessionLocal = async_sessionmaker(
+            bind=async_engine, autoflush=False, expire_on_commit=False
+        )
+    return async_engine
+
+
+async def get_async_db():
+    """
+    Sessao assincrona no banco principal, para leituras que nao devem bloquear o event loop.
+
+    Escritas continuam em get_db para passar pela replicacao do DualWriteSession.
+    """
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExecutorSaturated(Exception):
+    """Todas as threads ocupadas e a fila de espera cheia."""
+
+
+class BoundedExecutor:
+    """
+    Pool de threads com fila limitada para trabalho de CPU chamado a partir do event loop.
+
+    No maximo max_workers tarefas rodam ao mesmo tempo e max_queue esperam; alem disso
+    run levanta ExecutorSaturated na hora, em vez de acumular requisicoes que iriam
+    estourar o timeout do cliente de qualquer forma. So faz sentido para funcoes que
+    liberam o GIL (hashlib, por exemplo), senao as threads so disputam com o loop.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_pending = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Criado no primeiro uso: o import do modulo nao abre threads antes do fork dos workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=self.name
+                    )
+        return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(self.name)
+            self._pending += 1
+            self.submitted += 1
+            self.max_pending = max(self.max_pending, self._pending)
+
+        submitted_at = time.monotonic()
+
+        def call():
+            started = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                self._record(started - submitted_at, time.monotonic() - started)
+
+        try:
+            future = self._get_executor().submit(call)
+        except RuntimeError:
+            self._release()
+            raise
+        # Libera a vaga quando o future termina: ao fim da thread ou quando o request e
+        # cancelado ainda na fila (wrap_future cancela o future e call() nunca roda).
+        future.add_done_callback(lambda _: self._release())
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _record(self, waited: float, elapsed: float) -> None:
+        with self._lock:
+            self.completed += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self.total_run_seconds += elapsed
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def status(self) -> dict:
+        with self._lock:
+            completed = self.completed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait_seconds / completed * 1000, 3) if completed else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "avg_run_ms": round(self.total_run_seconds / completed * 1000, 3) if completed else 0.0,
+            }
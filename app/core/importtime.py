@@ -0,0 +1,81 @@
+"""
+Relatorio do tempo de import do boot de um worker, a partir de python -X importtime.
+
+Roda o import num processo novo (cache de modulos frio), soma o tempo proprio por pacote
+raiz e lista os modulos mais pesados. Sai com codigo 1 quando o total passa do orcamento,
+para travar regressoes no CI antes que cheguem ao autoscaling.
+
+Uso:
+    python -m app.core.importtime
+    python -m app.core.importtime --target app.main --top 20 --budget-ms 1500
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def profile_imports(target: str = "app.main") -> list[tuple[str, int, int, int]]:
+    """Devolve (modulo, tempo proprio us, tempo acumulado us, profundidade) na ordem do import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {target}:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def summarize(entries: list, target: str) -> dict:
+    total_us = next((cumulative for module, _, cumulative, _ in entries if module == target), 0)
+    by_package = defaultdict(int)
+    for module, self_us, _, _ in entries:
+        by_package[module.split(".", 1)[0]] += self_us
+    return {
+        "total_ms": total_us / 1000,
+        "modules": len(entries),
+        "by_package": sorted(by_package.items(), key=lambda item: item[1], reverse=True),
+        "by_self": sorted(entries, key=lambda entry: entry[1], reverse=True),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Relatorio de tempo de import do boot do worker.")
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+    args = parser.parse_args()
+
+    summary = summarize(profile_imports(args.target), args.target)
+    print(f"import {args.target}: {summary['total_ms']:.0f} ms, {summary['modules']} modulos "
+          f"(orcamento {args.budget_ms:.0f} ms)")
+
+    print("\nPor pacote (tempo proprio):")
+    for package, self_us in summary["by_package"][: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    print("\nModulos mais pesados (tempo proprio):")
+    for module, self_us, cumulative_us, _ in summary["by_self"][: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  (acumulado {cumulative_us / 1000:7.1f} ms)  {module}")
+
+    if summary["total_ms"] > args.budget_ms:
+        print(f"\nAcima do orcamento em {summary['total_ms'] - args.budget_ms:.0f} ms.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
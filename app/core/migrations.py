@@ -0,0 +1,151 @@
+"""
+Migracoes versionadas do schema, aplicadas uma vez fora do boot dos workers.
+
+Cada banco (principal e secundario) guarda as versoes aplicadas em _schema_migrations.
+Uma execucao aplica as pendentes em ordem, todas na mesma transacao; no Postgres um
+advisory lock impede que dois deploys migrem ao mesmo tempo.
+
+Uso:
+    python -m app.core.migrations            # aplica as pendentes
+    python -m app.core.migrations --status   # lista aplicadas e pendentes
+
+Para acrescentar uma migracao, adicione uma entrada no fim de MIGRATIONS com a proxima
+versao; nunca altere nem reordene as que ja foram aplicadas.
+"""
+import argparse
+import logging
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, Text, func, insert, inspect, select, text
+
+from app.core import config
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "_schema_migrations"
+# Chave do pg_advisory_xact_lock das migracoes (qualquer bigint fixo do projeto)
+MIGRATION_LOCK_KEY = 514_154_201
+
+_metadata = MetaData()
+schema_migrations = Table(
+    MIGRATIONS_TABLE,
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", Text, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+)
+
+
+def _create_model_schema(conn):
+    # Importa os modelos para registrar as tabelas em Base.metadata
+    from app.models import alert, battery, building, energy, maintenance, user  # noqa: F401
+
+    # Idempotente: em bancos que ja existiam antes das migracoes so cria o que falta.
+    config.Base.metadata.create_all(bind=conn)
+    for table in config.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _create_sync_queue(conn):
+    config._ensure_sync_queue_table(conn)
+
+
+def _create_battery_latest_index(conn):
+    from app.models.battery import Battery
+
+    for index in Battery.__table__.indexes:
+        if index.name == "ix_batteries_battery_name_created_at_id":
+            index.create(bind=conn, checkfirst=True)
+
+
+def _add_alert_updated_at(conn):
+    # Bancos criados depois desta versao ja recebem a coluna pela migracao 1
+    if "updated_at" in {column["name"] for column in inspect(conn).get_columns("alerts")}:
+        return
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE alerts ADD COLUMN updated_at TIMESTAMPTZ DEFAULT now()"))
+    else:
+        # SQLite nao aceita default nao constante em ADD COLUMN; o modelo envia now() no INSERT
+        conn.execute(text("ALTER TABLE alerts ADD COLUMN updated_at DATETIME"))
+    conn.execute(text("UPDATE alerts SET updated_at = COALESCE(resolved_at, created_at)"))
+
+
+# (versao, descricao, funcao, bancos onde se aplica)
+MIGRATIONS = [
+    (1, "Tabelas e indices dos modelos", _create_model_schema, ("primary", "secondary")),
+    (2, "Fila de pendencias offline", _create_sync_queue, ("secondary",)),
+    (3, "Indice da ultima leitura por bateria", _create_battery_latest_index, ("primary", "secondary")),
+    (4, "Coluna updated_at dos alertas", _add_alert_updated_at, ("primary", "secondary")),
+]
+
+
+def _targets() -> dict:
+    targets = {"primary": config.engine}
+    if config.local_engine is not None:
+        targets["secondary"] = config.local_engine
+    return targets
+
+
+def _applied_versions(conn) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(target: str, db_engine) -> list:
+    with db_engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        applied = _applied_versions(conn)
+        pending = [
+            migration
+            for migration in MIGRATIONS
+            if target in migration[3] and migration[0] not in applied
+        ]
+        for version, description, migrate, _ in pending:
+            logger.info("Aplicando migracao %s (%s) no banco %s.", version, description, target)
+            migrate(conn)
+            conn.execute(insert(schema_migrations).values(version=version, description=description))
+    return [migration[0] for migration in pending]
+
+
+def run_migrations() -> dict:
+    return {target: upgrade(target, db_engine) for target, db_engine in _targets().items()}
+
+
+def migration_status() -> dict:
+    status = {}
+    for target, db_engine in _targets().items():
+        with db_engine.connect() as conn:
+            applied = _applied_versions(conn)
+            conn.commit()
+        status[target] = {
+            "applied": sorted(applied),
+            "pending": [
+                migration[0]
+                for migration in MIGRATIONS
+                if target in migration[3] and migration[0] not in applied
+            ],
+        }
+    return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Aplica as migracoes pendentes do schema.")
+    parser.add_argument("--status", action="store_true", help="so lista versoes aplicadas e pendentes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.status:
+        for target, status in migration_status().items():
+            print(f"{target}: aplicadas {status['applied']}, pendentes {status['pending']}")
+        return
+
+    for target, versions in run_migrations().items():
+        if versions:
+            logger.info("Banco %s atualizado: migracoes %s.", target, versions)
+        else:
+            logger.info("Banco %s ja esta na versao mais recente.", target)
+
+
+if __name__ == "__main__":
+    main()
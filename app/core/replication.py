@@ -0,0 +1,224 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Intervalo minimo entre avisos de atraso, para nao inundar o log quando a replica fica lenta
+LAG_WARNING_INTERVAL_SECONDS = 30.0
+
+
+class ReplicationMetrics:
+    """Contadores da replicacao em segundo plano (atualizados pela thread e pelos requests)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.applied = 0
+        self.failed = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.last_batch_ms = 0.0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.last_error = None
+
+    def record_enqueued(self):
+        with self._lock:
+            self.enqueued += 1
+
+    def record_backpressure(self):
+        with self._lock:
+            self.backpressure_waits += 1
+
+    def record_batch(self, applied: int, failed: int, elapsed: float, lag: float, error=None):
+        with self._lock:
+            self.batches += 1
+            self.applied += applied
+            self.failed += failed
+            self.last_batch_ms = elapsed * 1000
+            self.last_lag_seconds = lag
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+            if error is not None:
+                self.last_error = str(error)[:1000]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enqueued": self.enqueued,
+                "applied": self.applied,
+                "failed": self.failed,
+                "batches": self.batches,
+                "backpressure_waits": self.backpressure_waits,
+                "last_batch_ms": round(self.last_batch_ms, 3),
+                "last_lag_seconds": round(self.last_lag_seconds, 3),
+                "max_lag_seconds": round(self.max_lag_seconds, 3),
+                "last_error": self.last_error,
+            }
+
+
+class BackgroundReplicator:
+    """
+    Aplica no banco local, numa thread propria, as escritas ja confirmadas no principal.
+
+    Cada item da fila e a lista de operacoes de um commit. A thread junta ate batch_size
+    commits e aplica tudo numa unica transacao; se o lote falhar, reaplica commit a commit
+    para que um item ruim nao descarte os demais. Com a fila cheia, submit bloqueia o
+    request ate abrir vaga (backpressure) e, passado enqueue_timeout, registra a espera.
+    Aplicar o commit fora da fila nao serve: um lote mais antigo ainda na fila seria
+    aplicado depois e sobrescreveria a linha com dados velhos.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        apply_batch,
+        maxsize: int,
+        batch_size: int,
+        enqueue_timeout: float,
+        lag_warning_seconds: float,
+    ):
+        self.name = name
+        self._apply_batch = apply_batch
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.enqueue_timeout = enqueue_timeout
+        self.lag_warning_seconds = lag_warning_seconds
+        self.metrics = ReplicationMetrics()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._last_warning_at = 0.0
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name=f"replicator-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, operations: list) -> None:
+        if not operations:
+            return
+        self.start()
+        # source_obj pertence a sessao do request e nao pode ser tocado por outra thread
+        item = (time.monotonic(), [dict(op, source_obj=None) for op in operations])
+        try:
+            self._queue.put(item, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.metrics.record_backpressure()
+            self._warn_if_behind(force=True)
+            self._queue.put(item)
+        self.metrics.record_enqueued()
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._apply(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _apply(self, batch: list) -> None:
+        started = time.monotonic()
+        lag = started - batch[0][0]
+        try:
+            self._apply_batch([op for _, operations in batch for op in operations])
+            self.metrics.record_batch(len(batch), 0, time.monotonic() - started, lag)
+        except Exception:
+            logger.exception("Falha ao replicar lote de %s commits; reaplicando um a um.", len(batch))
+            applied, failed, last_error = 0, 0, None
+            for _, operations in batch:
+                try:
+                    self._apply_batch(operations)
+                    applied += 1
+                except Exception as exc:
+                    failed += 1
+                    last_error = exc
+                    logger.exception("Falha ao sincronizar escrita no banco local.")
+            self.metrics.record_batch(applied, failed, time.monotonic() - started, lag, last_error)
+        self._warn_if_behind()
+
+    def _oldest_pending_age(self) -> float:
+        with self._queue.mutex:
+            head = self._queue.queue[0] if self._queue.queue else None
+        return time.monotonic() - head[0] if head is not None else 0.0
+
+    def _warn_if_behind(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if now - self._last_warning_at < LAG_WARNING_INTERVAL_SECONDS:
+            return
+        depth = self._queue.qsize()
+        lag = self._oldest_pending_age()
+        if force or lag > self.lag_warning_seconds or depth >= self.maxsize * 0.8:
+            self._last_warning_at = now
+            logger.warning(
+                "Replicacao %s atrasada: %s commits pendentes (limite %s), mais antigo ha %.1fs.",
+                self.name,
+                depth,
+                self.maxsize,
+                lag,
+            )
+
+    def flush(self, timeout: float = None) -> bool:
+        if self._queue.unfinished_tasks:
+            self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(
+                "Replicacao %s encerrada com %s commits pendentes.", self.name, self._queue.qsize()
+            )
+
+    def status(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queue_depth": self._queue.qsize(),
+            "queue_maxsize": self.maxsize,
+            "batch_size": self.batch_size,
+            "enqueue_timeout_seconds": self.enqueue_timeout,
+            "oldest_pending_seconds": round(self._oldest_pending_age(), 3),
+            "lagging": self._oldest_pending_age() > self.lag_warning_seconds,
+            **self.metrics.snapshot(),
+        }
+
+
+_replicators = {}
+
+
+def register_replicator(replicator: BackgroundReplicator) -> None:
+    _replicators[replicator.name] = replicator
+
+
+def replication_status() -> dict:
+    return {name: replicator.status() for name, replicator in _replicators.items()}
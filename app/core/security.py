@@ -9,13 +9,23 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
+from app.core.cache import principal_cache
 from app.core.config import get_db
+from app.core.executor import BoundedExecutor, ExecutorSaturated
 from app.models.user import User
+from app.schemas.user import UserResponse
 
 
 SECRET_KEY = os.getenv("SECRET_KEY", "change-this-secret-in-env")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 PASSWORD_HASH_ITERATIONS = 100_000
+# Threads dedicadas ao PBKDF2 (libera o GIL) e quantos pedidos podem esperar por uma;
+# alem disso o login responde 503 na hora em vez de enfileirar sem limite.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+password_hasher = BoundedExecutor("password-hash", PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
@@ -50,6 +60,27 @@ def verify_password(password: str, hashed_password: str) -> bool:
     return hmac.compare_digest(computed, expected_hash)
 
 
+async def _run_hashing(fn, *args):
+    try:
+        return await password_hasher.run(fn, *args)
+    except ExecutorSaturated as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again shortly",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        ) from exc
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password fora do event loop, no pool limitado de password_hasher."""
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """verify_password fora do event loop, no pool limitado de password_hasher."""
+    return await _run_hashing(verify_password, password, hashed_password)
+
+
 def _b64url_encode(data: bytes) -> str:
     return base64.urlsafe_b64encode(data).decode("utf-8").rstrip("=")
 
@@ -104,7 +135,7 @@ def decode_access_token(token: str) -> dict:
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
     db: Session = Depends(get_db),
-) -> User:
+) -> UserResponse:
     if credentials is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication required")
 
@@ -113,8 +144,17 @@ def get_current_user(
     if not email:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token subject")
 
+    # Sessao so abre conexao na primeira query, entao um acerto no cache nao toca o banco
+    generation = principal_cache.generation()
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+
     user = db.query(User).filter(User.email == email).first()
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
-    return user
+    principal = UserResponse.model_validate(user)
+    # Descartado se update_user/delete_user invalidou o cache durante a consulta
+    principal_cache.set(email, principal, generation)
+    return principal
@@ -0,0 +1,251 @@
+"""
+Worker que drena a fila de pendencias offline (_offline_sync_queue) para o banco principal.
+
+Varios workers podem rodar em paralelo: cada um reserva um lote com FOR UPDATE SKIP LOCKED
+e reenvia as linhas em upserts/deletes agrupados por modelo. Linhas que falham recebem
+backoff exponencial (next_attempt_at) e nao bloqueiam o resto da fila. Periodicamente o
+worker compacta a fila, apagando pendencias superadas por outra mais nova da mesma linha.
+
+Uso:
+    python -m app.core.sync_worker
+    python -m app.core.sync_worker --once --batch-size 1000
+
+Com workers ativos, desligue a drenagem no request: SYNC_QUEUE_DRAIN_IN_REQUEST=false.
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, inspect, or_, select, tuple_, update
+
+from app.core import config
+from app.core.config import sync_queue
+from app.crud.upsert import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+SYNC_WORKER_BATCH_SIZE = int(os.getenv("SYNC_WORKER_BATCH_SIZE", "500"))
+SYNC_WORKER_INTERVAL_SECONDS = float(os.getenv("SYNC_WORKER_INTERVAL_SECONDS", "5"))
+SYNC_QUEUE_COMPACT_INTERVAL_SECONDS = float(os.getenv("SYNC_QUEUE_COMPACT_INTERVAL_SECONDS", "60"))
+
+
+def _claim_statement(now: datetime, limit: int):
+    # SKIP LOCKED deixa cada worker com um lote diferente; o SQLite ignora o FOR UPDATE
+    # (o banco inteiro tem um unico escritor), entao la basta um worker.
+    queue = sync_queue.c
+    return (
+        select(queue.id, queue.model_key, queue.operation, queue.pk_values, queue.payload, queue.attempts)
+        .where(
+            queue.synced_at.is_(None),
+            or_(queue.next_attempt_at.is_(None), queue.next_attempt_at <= now),
+        )
+        .order_by(queue.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+
+def _coalesce(rows) -> list:
+    """
+    Reduz as linhas do lote a uma operacao final por (modelo, chave).
+
+    Vale a operacao e o estado da ultima pendencia de cada linha (um delete depois de um
+    upsert vira delete); os ids de todas vao juntos para serem marcados no fim. A ordem
+    entre modelos fica a cargo de _replay. Devolve
+    [(model_cls, operation, pk_values, payload, [ids das linhas da fila])].
+    """
+    latest = {}
+    for row in rows:
+        key = (row["model_key"], tuple(row["pk_values"] or ()) or ("row", row["id"]))
+        entry = latest.get(key)
+        ids = (entry[4] if entry is not None else []) + [row["id"]]
+        latest[key] = (
+            config._resolve_model(row["model_key"]),
+            row["operation"],
+            row["pk_values"],
+            row["payload"],
+            ids,
+        )
+    return list(latest.values())
+
+
+def _dependency_order(models) -> list:
+    # Ordem das FKs do metadata (pais primeiro), nao a ordem de chegada: depois da coalescencia
+    # um filho pode vir antes do pai no lote (pai atualizado de novo, filho criado no meio)
+    position = {table: index for index, table in enumerate(config.Base.metadata.sorted_tables)}
+    return sorted(models, key=lambda model_cls: position.get(model_cls.__table__, len(position)))
+
+
+def _replay(primary_db, operations: list) -> None:
+    """Aplica as operacoes no principal: um upsert por modelo e um delete por modelo."""
+    upserts, deletes = {}, {}
+    for model_cls, operation, pk_values, payload, _ in operations:
+        if operation == "upsert" and payload is not None:
+            upserts.setdefault(model_cls, []).append(config._mapper_plan(model_cls).deserialize(payload))
+        elif operation == "delete" and pk_values and None not in pk_values:
+            deletes.setdefault(model_cls, []).append(tuple(pk_values))
+
+    # Pais antes dos filhos nos upserts e o inverso nos deletes
+    for model_cls in _dependency_order(upserts):
+        values = upserts[model_cls]
+        pk_columns = [col.name for col in inspect(model_cls).mapper.primary_key]
+        insert_stmt = dialect_insert(primary_db, model_cls)
+        for chunk in _group_by_keys(values):
+            stmt = insert_stmt.values(chunk)
+            update_columns = {
+                key: stmt.excluded[key] for key in chunk[0] if key not in pk_columns
+            }
+            if update_columns:
+                stmt = stmt.on_conflict_do_update(index_elements=pk_columns, set_=update_columns)
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=pk_columns)
+            primary_db.execute(stmt)
+
+    for model_cls in reversed(_dependency_order(deletes)):
+        pk_list = deletes[model_cls]
+        pk_attrs = inspect(model_cls).mapper.primary_key
+        if len(pk_attrs) == 1:
+            condition = pk_attrs[0].in_([pk[0] for pk in pk_list])
+        else:
+            condition = tuple_(*pk_attrs).in_(pk_list)
+        primary_db.execute(delete(model_cls).where(condition))
+
+
+def _group_by_keys(values: list) -> list:
+    # Um INSERT multi-linha exige o mesmo conjunto de colunas em todas as linhas
+    groups = {}
+    for row in values:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return list(groups.values())
+
+
+def drain_once(batch_size: int = SYNC_WORKER_BATCH_SIZE) -> dict:
+    """
+    Reserva e reenvia um lote da fila. Devolve contadores do lote.
+
+    As linhas ficam travadas na transacao do banco local ate o fim do lote, entao outro
+    worker pula essas linhas em vez de reenvia-las de novo.
+    """
+    secondary_db = config.LocalSessionLocal()
+    primary_db = config.SessionLocal()
+    synced, failed = 0, 0
+    try:
+        now = datetime.now(timezone.utc)
+        rows = secondary_db.execute(_claim_statement(now, batch_size)).mappings().all()
+        if not rows:
+            secondary_db.rollback()
+            return {"claimed": 0, "synced": 0, "failed": 0}
+
+        operations = _coalesce(rows)
+        try:
+            _replay(primary_db, operations)
+            primary_db.commit()
+            synced_ids = [row["id"] for row in rows]
+        except Exception:
+            primary_db.rollback()
+            logger.exception("Falha ao reenviar lote de %s pendencias; tentando uma a uma.", len(rows))
+            synced_ids = []
+            attempts = {row["id"]: int(row["attempts"]) for row in rows}
+            for operation in operations:
+                try:
+                    _replay(primary_db, [operation])
+                    primary_db.commit()
+                    synced_ids.extend(operation[4])
+                except Exception as exc:
+                    primary_db.rollback()
+                    for queue_id in operation[4]:
+                        secondary_db.execute(
+                            update(sync_queue)
+                            .where(sync_queue.c.id == queue_id)
+                            .values(
+                                attempts=attempts[queue_id] + 1,
+                                last_error=str(exc)[:1000],
+                                next_attempt_at=config._sync_retry_at(attempts[queue_id] + 1),
+                            )
+                        )
+                        failed += 1
+
+        if synced_ids:
+            secondary_db.execute(
+                update(sync_queue)
+                .where(sync_queue.c.id.in_(synced_ids))
+                .values(synced_at=now, last_error=None, next_attempt_at=None)
+            )
+            synced = len(synced_ids)
+        secondary_db.commit()
+        return {"claimed": len(rows), "synced": synced, "failed": failed}
+    except Exception:
+        secondary_db.rollback()
+        raise
+    finally:
+        primary_db.close()
+        secondary_db.close()
+
+
+def compact_queue() -> dict:
+    secondary_db = config.LocalSessionLocal()
+    try:
+        return config._compact_sync_queue(secondary_db)
+    except Exception:
+        secondary_db.rollback()
+        raise
+    finally:
+        secondary_db.close()
+
+
+def run(batch_size: int, interval: float, once: bool = False) -> None:
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+
+    compacted_at = None
+    while not stopping.is_set():
+        if compacted_at is None or time.monotonic() - compacted_at >= SYNC_QUEUE_COMPACT_INTERVAL_SECONDS:
+            compacted_at = time.monotonic()
+            try:
+                result = compact_queue()
+                if result["removed"]:
+                    logger.info("Fila offline compactada: %s pendencias superadas removidas.", result["removed"])
+            except Exception:
+                logger.exception("Falha ao compactar a fila de pendencias offline.")
+
+        try:
+            result = drain_once(batch_size)
+        except Exception:
+            logger.exception("Falha ao drenar a fila de pendencias offline.")
+            result = {"claimed": 0}
+        else:
+            if result["claimed"]:
+                logger.info(
+                    "Fila offline: %s reservadas, %s sincronizadas, %s com falha.",
+                    result["claimed"],
+                    result["synced"],
+                    result["failed"],
+                )
+        if once:
+            return
+        # Lote cheio: provavelmente ha mais pendencias, segue sem esperar
+        if result["claimed"] < batch_size:
+            stopping.wait(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drena a fila de pendencias offline para o banco principal.")
+    parser.add_argument("--batch-size", type=int, default=SYNC_WORKER_BATCH_SIZE)
+    parser.add_argument("--interval", type=float, default=SYNC_WORKER_INTERVAL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="drena um lote e sai")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if config.LocalSessionLocal is None:
+        raise SystemExit("Nenhum banco local configurado; nao ha fila offline para drenar.")
+
+    run(args.batch_size, args.interval, once=args.once)
+
+
+if __name__ == "__main__":
+    main()
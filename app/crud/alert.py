@@ -1,7 +1,14 @@
 from app.models.alert import Alert
 from app.schemas.alerts import AlertCreate, AlertResponse, AlertResolve
 from app import SessionLocal, get_db, HTTPException, Depends
+from app.core.conditional import watermark_statement
+from app.crud.serialization import response_statement, rows_as_dicts
+from app.crud.pagination import keyset_page, split_page
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
 from app.schemas.alerts import ElevatorWorkingAlert, ElevatorWorkingAlertResponse
 
 
@@ -21,7 +28,6 @@ class AlertCRUD:
         )
         db.add(db_alert)
         db.commit()
-        db.refresh(db_alert)
         return AlertResponse.from_orm(db_alert)
 
     @staticmethod
@@ -32,9 +38,16 @@ class AlertCRUD:
         return AlertResponse.from_orm(db_alert)
 
     @staticmethod
-    def get_all_alerts(db: Session) -> list[AlertResponse]:
-        alerts = db.query(Alert).all()
-        return [AlertResponse.from_orm(alert) for alert in alerts]
+    def get_all_alerts(
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[AlertResponse], Optional[str]]:
+        query = keyset_page(db.query(Alert), Alert, since, until, cursor, limit)
+        alerts, next_cursor = split_page(query.all(), limit)
+        return [AlertResponse.from_orm(alert) for alert in alerts], next_cursor
 
     @staticmethod
     def resolve_alert(db: Session, alert_id: int, alert_resolve: AlertResolve) -> AlertResponse:
@@ -43,8 +56,9 @@ class AlertCRUD:
             raise HTTPException(status_code=404, detail="Alert not found")
         db_alert.is_resolved = True
         db_alert.resolved_at = alert_resolve.resolved_at
+        # resolved_at vem do cliente e pode nao mudar; forca o UPDATE para a versao andar
+        db_alert.updated_at = func.now()
         db.commit()
-        db.refresh(db_alert)
         return AlertResponse.from_orm(db_alert)
 
     @staticmethod
@@ -64,11 +78,40 @@ class AlertCRUD:
         )
         db.add(db_alert)
         db.commit()
-        db.refresh(db_alert)
         return ElevatorWorkingAlertResponse(
             id=db_alert.id,
             elevator_id=alert.elevator_id,
             is_working=alert.is_working,
             reported_at=alert.reported_at,
             created_at=db_alert.created_at
-        )
\ No newline at end of file
+        )
+
+
+class AsyncAlertCRUD:
+
+    @staticmethod
+    async def get_watermark(db: AsyncSession) -> tuple:
+        # updated_at entra na marca porque resolve_alert altera linhas existentes.
+        result = await db.execute(watermark_statement(Alert, Alert.created_at, Alert.updated_at))
+        return tuple(result.one())
+
+    @staticmethod
+    async def get_alert(db: AsyncSession, alert_id: int) -> AlertResponse:
+        db_alert = await db.get(Alert, alert_id)
+        if not db_alert:
+            raise HTTPException(status_code=404, detail="Alert not found")
+        return AlertResponse.from_orm(db_alert)
+
+    @staticmethod
+    async def get_all_alerts(
+        db: AsyncSession,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        # Linhas confiaveis do banco: sem objetos ORM nem validacao Pydantic por linha.
+        statement, names = response_statement(Alert, AlertResponse)
+        statement = keyset_page(statement, Alert, since, until, cursor, limit)
+        rows, next_cursor = split_page((await db.execute(statement)).all(), limit)
+        return rows_as_dicts(rows, names), next_cursor
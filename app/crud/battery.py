@@ -1,8 +1,17 @@
 from app.models.battery import Battery
-from app.schemas.battery import BatteryCreate, BatteryResponse
+from app.schemas.battery import BateryType, BatteryCreate, BatteryResponse
 from app import SessionLocal, get_db, HTTPException, Depends
+from app.core.cache import battery_latest_cache
+from app.core.conditional import watermark_statement
+from app.crud.energy_rollup import as_utc
+from app.crud.export import export_statement, stream_export
+from app.crud.serialization import response_statement, rows_as_dicts
+from app.crud.pagination import keyset_page, split_page
+from sqlalchemy import select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session  
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Iterator, Optional
 
 
 class BatteryCRUD:
@@ -16,12 +25,16 @@ class BatteryCRUD:
             temperature=battery.temperature,
             voltage=battery.voltage,
             current=battery.current,
-            created_at= datetime.utcnow()
+            created_at= datetime.now(timezone.utc)
         )
         db.add(db_battery)
         db.commit()
-        db.refresh(db_battery)
-        return BatteryResponse.from_orm(db_battery)
+        response = BatteryResponse.from_orm(db_battery)
+        # A leitura recem-criada e a mais nova dessa bateria (created_at = agora). Invalidar
+        # antes avanca a geracao, entao uma leitura do banco em andamento nao a sobrescreve.
+        battery_latest_cache.invalidate(response.battery_name)
+        battery_latest_cache.set(response.battery_name, response.model_dump())
+        return response
 
     @staticmethod
     def get_battery(db: Session, battery_id: int) -> BatteryResponse:
@@ -31,11 +44,94 @@ class BatteryCRUD:
         return BatteryResponse.from_orm(db_battery)
 
     @staticmethod
-    def get_all_batteries(db: Session) -> list[BatteryResponse]:
-        batteries = db.query(Battery).all()
-        return [BatteryResponse.from_orm(battery) for battery in batteries]
+    def get_all_batteries(
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[BatteryResponse], Optional[str]]:
+        query = keyset_page(db.query(Battery), Battery, since, until, cursor, limit)
+        batteries, next_cursor = split_page(query.all(), limit)
+        return [BatteryResponse.from_orm(battery) for battery in batteries], next_cursor
 
     @staticmethod
     def get_all_batteries_by_the_name(db: Session, battery_name: str) -> list[BatteryResponse]:
         batteries = db.query(Battery).filter(Battery.battery_name == battery_name).all()
-        return [BatteryResponse.from_orm(battery) for battery in batteries]
\ No newline at end of file
+        return [BatteryResponse.from_orm(battery) for battery in batteries]
+
+    @staticmethod
+    def export_batteries(
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        export_format: str = "ndjson",
+    ) -> Iterator[str]:
+        return stream_export(export_statement(Battery, since, until), export_format)
+
+
+def latest_readings_statement(battery_names: list):
+    """
+    Ultima leitura de cada bateria pedida: um ORDER BY created_at DESC LIMIT 1 por nome,
+    juntos num UNION ALL.
+
+    Cada ramo e um seek no indice (battery_name, created_at, id), entao o custo depende
+    do numero de baterias e nao do tamanho do historico, inclusive no SQLite.
+    """
+    statement, names = response_statement(Battery, BatteryResponse)
+    branches = [
+        select(
+            statement.where(Battery.battery_name == name)
+            .order_by(Battery.created_at.desc(), Battery.id.desc())
+            .limit(1)
+            .subquery()
+        )
+        for name in battery_names
+    ]
+    return (branches[0] if len(branches) == 1 else union_all(*branches)), names
+
+
+class AsyncBatteryCRUD:
+    @staticmethod
+    async def get_watermark(db: AsyncSession) -> tuple:
+        result = await db.execute(watermark_statement(Battery, Battery.created_at))
+        return tuple(result.one())
+
+    @staticmethod
+    async def get_battery(db: AsyncSession, battery_id: int) -> BatteryResponse:
+        db_battery = await db.get(Battery, battery_id)
+        if not db_battery:
+            raise HTTPException(status_code=404, detail="Battery not found")
+        return BatteryResponse.from_orm(db_battery)
+
+    @staticmethod
+    async def get_all_batteries(
+        db: AsyncSession,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        # Linhas confiaveis do banco: sem objetos ORM nem validacao Pydantic por linha.
+        statement, names = response_statement(Battery, BatteryResponse)
+        statement = keyset_page(statement, Battery, since, until, cursor, limit)
+        rows, next_cursor = split_page((await db.execute(statement)).all(), limit)
+        return rows_as_dicts(rows, names), next_cursor
+
+    @staticmethod
+    async def get_latest_batteries(db: AsyncSession) -> list[dict]:
+        generation = battery_latest_cache.generation()
+        latest = {name: battery_latest_cache.get(name) for name in BateryType}
+        missing = [name for name, reading in latest.items() if reading is None]
+        if missing:
+            statement, names = latest_readings_statement(missing)
+            for reading in rows_as_dicts((await db.execute(statement)).all(), names):
+                # UTC com offset, como as leituras gravadas pelo create_battery: a resposta
+                # nao muda de formato conforme a leitura venha do cache ou do banco (SQLite
+                # devolve datetime sem tzinfo).
+                if reading["created_at"] is not None:
+                    reading["created_at"] = as_utc(reading["created_at"])
+                name = BateryType(reading["battery_name"])
+                battery_latest_cache.set(name, reading, generation)
+                latest[name] = reading
+        # Baterias sem nenhuma leitura ficam de fora
+        return [reading for reading in latest.values() if reading is not None]
@@ -1,17 +1,211 @@
+import logging
+from datetime import datetime, timedelta, timezone
 from app import HTTPException, Depends, get_db
+from app.core.cache import building_dashboard_cache
+from app.crud.energy_rollup import REBUILD_BATCH_SIZE, as_utc, bucket_start
+from app.crud.upsert import dialect_insert
 from app.models.building import BuildingEnergyTopKPI as Building
+from app.models.building import BuildingEnergyDistributionDaily
+from app.models.energy import BuildingEnergy, EnergyRollup
 from app.schemas.building import BuildingEnergyDashboardResponse, BuildingEnergyTopKPICreate
+from app.schemas.energy import BuildingEnergyCreate, BuildingEnergyResponse, RollupBucket
+from sqlalchemy import event, func, select, text
 from sqlalchemy.orm import Session
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+KPI_DAILY_AVG_WINDOW_DAYS = 7
+PENDING_DISTRIBUTIONS_KEY = "building_distribution_pending"
+
+
+def _percent(part: float, whole: float) -> float:
+    return round(part / whole * 100, 2) if whole else 0.0
+
+
+def derive_energy_kpis(
+    today_surplus: float,
+    previous_surpluses: list[float],
+    distributed_kwh: float,
+    active_destinations: int,
+    day_fraction: float = 1.0,
+) -> dict:
+    # Deficit conta como sobra zero, tanto hoje quanto nos dias da media
+    surplus = max(today_surplus, 0.0)
+    previous = [max(value, 0.0) for value in previous_surpluses]
+    daily_avg = sum(previous) / len(previous) if previous else 0.0
+    # Hoje ainda nao terminou: compara com a media proporcional a parte do dia ja decorrida,
+    # senao toda manha apareceria como deficit frente a dias completos
+    expected = daily_avg * day_fraction
+    available = max(surplus - distributed_kwh, 0.0)
+    return {
+        "surplus_available_kwh": surplus,
+        "surplus_vs_daily_avg_percent": _percent(surplus - expected, expected),
+        "currently_distributed_kwh": distributed_kwh,
+        "active_destinations": active_destinations,
+        "available_for_distribution_kwh": available,
+        "unused_percent": _percent(available, surplus),
+    }
+
+
+def _upsert_distribution(db: Session, distributions: Iterable) -> None:
+    totals = {}
+    for distribution in distributions:
+        if distribution.created_at is None:
+            continue
+        key = (bucket_start(distribution.created_at, RollupBucket.day), distribution.main_destination)
+        supplied_kwh, deliveries = totals.get(key, (0.0, 0))
+        totals[key] = (supplied_kwh + distribution.supplied_energy, deliveries + 1)
+    if not totals:
+        return
+
+    stmt = dialect_insert(db, BuildingEnergyDistributionDaily).values(
+        [
+            {
+                "day_start": day_start,
+                "main_destination": destination,
+                "supplied_kwh": supplied_kwh,
+                "deliveries": deliveries,
+            }
+            for (day_start, destination), (supplied_kwh, deliveries) in totals.items()
+        ]
+    )
+    table = BuildingEnergyDistributionDaily.__table__
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["day_start", "main_destination"],
+            set_={
+                "supplied_kwh": table.c.supplied_kwh + stmt.excluded.supplied_kwh,
+                "deliveries": table.c.deliveries + stmt.excluded.deliveries,
+            },
+        )
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _accumulate_pending_distributions(session: Session, flush_context) -> None:
+    distributions = session.info.pop(PENDING_DISTRIBUTIONS_KEY, None)
+    if not distributions:
+        return
+    # Savepoint: uma falha nos totais descarta so o upsert; rebuild_distribution recompoe
+    savepoint = session.connection().begin_nested()
+    try:
+        _upsert_distribution(session, distributions)
+        savepoint.commit()
+    except Exception:
+        savepoint.rollback()
+        logger.exception("Falha ao atualizar totais diarios de distribuicao.")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_distributions(session: Session, previous_transaction) -> None:
+    session.info.pop(PENDING_DISTRIBUTIONS_KEY, None)
 
 
 class BuildingCRUD:
 
     @staticmethod
     def get_building_energy_top_kpi(db: Session, building_id: int) -> BuildingEnergyDashboardResponse:
-        building = db.query(Building).filter(Building.id == building_id).first()
-        if not building:
-            raise HTTPException(status_code=404, detail="Building not found")
-        return BuildingEnergyDashboardResponse.from_orm(building)
+        # As leituras de energia e a distribuicao nao tem predio: os KPIs sao do site
+        # inteiro e building_id so seleciona uma entrada de dashboard existente.
+        def load():
+            building = db.query(Building.id).filter(Building.id == building_id).first()
+            if not building:
+                raise HTTPException(status_code=404, detail="Building not found")
+            return BuildingEnergyDashboardResponse(id=building_id, **BuildingCRUD.compute_energy_kpis(db))
+
+        return building_dashboard_cache.get_or_set(building_id, load)
+
+    @staticmethod
+    def compute_energy_kpis(db: Session, moment: datetime | None = None) -> dict:
+        # Le apenas estado ja agregado: os rollups diarios de energia da janela
+        # e as linhas de distribuicao do dia, nunca as leituras brutas.
+        moment = as_utc(moment or datetime.now(timezone.utc))
+        today = bucket_start(moment, RollupBucket.day)
+        day_rollups = (
+            db.query(EnergyRollup.bucket_start, EnergyRollup.generated_sum, EnergyRollup.consumed_sum)
+            .filter(
+                EnergyRollup.bucket_size == RollupBucket.day.value,
+                EnergyRollup.bucket_start >= today - timedelta(days=KPI_DAILY_AVG_WINDOW_DAYS),
+                EnergyRollup.bucket_start <= today,
+            )
+            .all()
+        )
+        today_surplus = 0.0
+        previous_surpluses = []
+        for day, generated, consumed in day_rollups:
+            if as_utc(day) == today:
+                today_surplus = generated - consumed
+            else:
+                previous_surpluses.append(generated - consumed)
+
+        distributed_kwh, active_destinations = (
+            db.query(
+                func.coalesce(func.sum(BuildingEnergyDistributionDaily.supplied_kwh), 0.0),
+                func.count(BuildingEnergyDistributionDaily.id),
+            )
+            .filter(BuildingEnergyDistributionDaily.day_start == today)
+            .one()
+        )
+        return derive_energy_kpis(
+            today_surplus,
+            previous_surpluses,
+            float(distributed_kwh),
+            int(active_destinations),
+            day_fraction=(moment - today) / timedelta(days=1),
+        )
+
+    @staticmethod
+    def create_building_energy(db: Session, data: BuildingEnergyCreate) -> BuildingEnergyResponse:
+        supplied_at = datetime.now(timezone.utc)
+        building_energy = BuildingEnergy(
+            supplied_energy=data.supplied_energy,
+            main_destination=data.main_destination,
+            created_at=supplied_at,
+        )
+        db.add(building_energy)
+        BuildingCRUD.record_distribution(db, [building_energy])
+        db.commit()
+        building_dashboard_cache.invalidate()
+        return BuildingEnergyResponse.from_orm(building_energy)
+
+    @staticmethod
+    def record_distribution(db: Session, distributions: Iterable) -> None:
+        # Como EnergyRollupCRUD.record_readings: chamado antes do commit, o upsert dos totais
+        # diarios roda no flush do commit, na mesma transacao da distribuicao.
+        db.info.setdefault(PENDING_DISTRIBUTIONS_KEY, []).extend(distributions)
+
+    @staticmethod
+    def rebuild_distribution(db: Session, since: datetime, until: datetime) -> int:
+        start = bucket_start(since, RollupBucket.day)
+        end = bucket_start(until, RollupBucket.day)
+        if end < as_utc(until):
+            end += timedelta(days=1)
+
+        if db.get_bind().dialect.name == "postgresql":
+            # Mesmo protocolo de rebuild_rollups: distribuicoes concorrentes esperam este commit
+            db.execute(
+                text(f"LOCK TABLE {BuildingEnergyDistributionDaily.__tablename__} IN SHARE ROW EXCLUSIVE MODE")
+            )
+
+        db.query(BuildingEnergyDistributionDaily).filter(
+            BuildingEnergyDistributionDaily.day_start >= start,
+            BuildingEnergyDistributionDaily.day_start < end,
+        ).delete(synchronize_session=False)
+
+        statement = (
+            select(BuildingEnergy.created_at, BuildingEnergy.main_destination, BuildingEnergy.supplied_energy)
+            .where(BuildingEnergy.created_at >= start, BuildingEnergy.created_at < end)
+            .execution_options(stream_results=True, yield_per=REBUILD_BATCH_SIZE)
+        )
+        total = 0
+        for partition in db.execute(statement).partitions():
+            _upsert_distribution(db, partition)
+            total += len(partition)
+
+        db.commit()
+        building_dashboard_cache.invalidate()
+        return total
     
     @staticmethod
     def create_building_energy_top_kpi(db: Session, kpi_data: BuildingEnergyTopKPICreate) -> BuildingEnergyDashboardResponse:
@@ -27,7 +221,7 @@ class BuildingCRUD:
         building.unused_percent = kpi_data.unused_percent
 
         db.commit()
-        db.refresh(building)
+        building_dashboard_cache.invalidate(building.id)
         return BuildingEnergyDashboardResponse.from_orm(building)
     
     @staticmethod
@@ -44,6 +238,7 @@ class BuildingCRUD:
             raise HTTPException(status_code=404, detail="Building not found")
         db.delete(building)
         db.commit()
+        building_dashboard_cache.invalidate(building_id)
 
     @staticmethod
     def update_building_energy_top_kpi(db: Session, kpi_id: int, kpi_data: BuildingEnergyTopKPICreate) -> BuildingEnergyDashboardResponse:
@@ -59,5 +254,5 @@ class BuildingCRUD:
         building.unused_percent = kpi_data.unused_percent
 
         db.commit()
-        db.refresh(building)
+        building_dashboard_cache.invalidate(building.id)
         return BuildingEnergyDashboardResponse.from_orm(building)
@@ -1,25 +1,88 @@
 from app.models.energy import Energy
-from app.schemas.energy import EnergyCreate, EnergyResponse
+from app.schemas.energy import EnergyCreate, EnergyResponse, EnergyBulkItemResult, EnergyBulkResponse
 from app import SessionLocal, get_db, HTTPException, Depends
+from app.crud.energy_rollup import EnergyRollupCRUD
+from app.crud.export import export_statement, stream_export
+from app.crud.serialization import response_statement, rows_as_dicts
+from app.crud.pagination import keyset_page, split_page
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+MAX_ENERGY_BULK_ROWS = 10_000
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    )
 
 
 class EnergyCRUD:
     @staticmethod
     def create_energy(db: Session, energy: EnergyCreate) -> EnergyResponse:
+        created_at = datetime.now(timezone.utc)
         db_energy = Energy(
             energy_generated=energy.energy_generated,
             energy_consumed=energy.energy_consumed,
             energy_stored=energy.energy_stored,
             energy_origin=energy.energy_origin,
-            created_at= datetime.utcnow() 
+            created_at=created_at
         )
         db.add(db_energy)
+        EnergyRollupCRUD.record_readings(db, [db_energy])
         db.commit()
-        db.refresh(db_energy)
         return EnergyResponse.from_orm(db_energy)
 
+    @staticmethod
+    def create_energy_bulk(db: Session, rows: list[dict]) -> EnergyBulkResponse:
+        if len(rows) > MAX_ENERGY_BULK_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {MAX_ENERGY_BULK_ROWS} energy records per request",
+            )
+
+        results = [EnergyBulkItemResult(index=index) for index in range(len(rows))]
+        pending = []
+        created_at = datetime.now(timezone.utc)
+
+        for index, row in enumerate(rows):
+            try:
+                energy = EnergyCreate.model_validate(row)
+            except ValidationError as exc:
+                results[index].error = _format_validation_error(exc)
+                continue
+            pending.append(
+                (
+                    index,
+                    Energy(
+                        energy_generated=energy.energy_generated,
+                        energy_consumed=energy.energy_consumed,
+                        energy_stored=energy.energy_stored,
+                        energy_origin=energy.energy_origin,
+                        created_at=created_at,
+                    ),
+                )
+            )
+
+        if pending:
+            # Um unico flush: o SQLAlchemy agrupa os INSERTs em lotes multi-linha com RETURNING id.
+            db.add_all([db_energy for _, db_energy in pending])
+            EnergyRollupCRUD.record_readings(db, [db_energy for _, db_energy in pending])
+            db.commit()
+            for index, db_energy in pending:
+                results[index].id = db_energy.id
+
+        return EnergyBulkResponse(
+            received=len(rows),
+            inserted=len(pending),
+            failed=len(rows) - len(pending),
+            results=results,
+        )
+
     @staticmethod
     def get_energy(db: Session, energy_id: int) -> EnergyResponse:
         db_energy = db.query(Energy).filter(Energy.id == energy_id).first()
@@ -28,6 +91,44 @@ class EnergyCRUD:
         return EnergyResponse.from_orm(db_energy)
 
     @staticmethod
-    def get_all_energy(db: Session) -> list[EnergyResponse]:
-        energies = db.query(Energy).all()
-        return [EnergyResponse.from_orm(energy) for energy in energies]
\ No newline at end of file
+    def get_all_energy(
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[EnergyResponse], Optional[str]]:
+        query = keyset_page(db.query(Energy), Energy, since, until, cursor, limit)
+        energies, next_cursor = split_page(query.all(), limit)
+        return [EnergyResponse.from_orm(energy) for energy in energies], next_cursor
+
+    @staticmethod
+    def export_energy(
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        export_format: str = "ndjson",
+    ) -> Iterator[str]:
+        return stream_export(export_statement(Energy, since, until), export_format)
+
+
+class AsyncEnergyCRUD:
+    @staticmethod
+    async def get_energy(db: AsyncSession, energy_id: int) -> EnergyResponse:
+        db_energy = await db.get(Energy, energy_id)
+        if not db_energy:
+            raise HTTPException(status_code=404, detail="Energy record not found")
+        return EnergyResponse.from_orm(db_energy)
+
+    @staticmethod
+    async def get_all_energy(
+        db: AsyncSession,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        # Linhas confiaveis do banco: sem objetos ORM nem validacao Pydantic por linha.
+        statement, names = response_statement(Energy, EnergyResponse)
+        statement = keyset_page(statement, Energy, since, until, cursor, limit)
+        rows, next_cursor = split_page((await db.execute(statement)).all(), limit)
+        return rows_as_dicts(rows, names), next_cursor
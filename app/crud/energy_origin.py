@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.energy import Energy, EnergyOriginReading, origin_rows
+from app.schemas.energy import EnergyOriginTotal
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+class EnergyOriginCRUD:
+
+    @staticmethod
+    def get_breakdown(
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        source: Optional[str] = None,
+    ) -> list[EnergyOriginTotal]:
+        query = db.query(
+            EnergyOriginReading.source,
+            func.sum(EnergyOriginReading.amount),
+            func.count(EnergyOriginReading.id),
+        )
+        if since is not None:
+            query = query.filter(EnergyOriginReading.created_at >= since)
+        if until is not None:
+            query = query.filter(EnergyOriginReading.created_at < until)
+        if source is not None:
+            query = query.filter(EnergyOriginReading.source == source)
+
+        rows = query.group_by(EnergyOriginReading.source).order_by(EnergyOriginReading.source).all()
+        return [
+            EnergyOriginTotal(source=row_source, total=total or 0.0, readings_count=count)
+            for row_source, total, count in rows
+        ]
+
+    @staticmethod
+    def backfill(db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+        statement = select(Energy.id, Energy.energy_origin, Energy.created_at)
+        if since is not None:
+            statement = statement.where(Energy.created_at >= since)
+        if until is not None:
+            statement = statement.where(Energy.created_at < until)
+        statement = statement.execution_options(stream_results=True, yield_per=BACKFILL_BATCH_SIZE)
+
+        total = 0
+        for partition in db.execute(statement).partitions():
+            energy_ids = [row.id for row in partition]
+            db.execute(delete(EnergyOriginReading).where(EnergyOriginReading.energy_id.in_(energy_ids)))
+            rows = [origin_row for row in partition for origin_row in origin_rows(row)]
+            if rows:
+                db.execute(insert(EnergyOriginReading), rows)
+            total += len(partition)
+
+        db.commit()
+        return total
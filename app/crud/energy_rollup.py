@@ -0,0 +1,170 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, event, func, select, text
+from sqlalchemy.orm import Session
+
+from app.core.cache import building_dashboard_cache
+from app.crud.upsert import dialect_insert, lesser_greater
+from app.models.energy import Energy, EnergyRollup
+from app.schemas.energy import EnergyRollupResponse, RollupBucket
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_METRICS = (
+    ("generated", "energy_generated"),
+    ("consumed", "energy_consumed"),
+    ("stored", "energy_stored"),
+)
+REBUILD_BATCH_SIZE = 5000
+PENDING_READINGS_KEY = "energy_rollup_pending_readings"
+
+
+def as_utc(moment: datetime) -> datetime:
+    # Colunas timezone=True: sempre UTC com offset, o valor gravado nao depende do TimeZone
+    # da sessao do Postgres. Datetimes sem tzinfo (SQLite) ja estao em UTC.
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def bucket_start(moment: datetime, bucket: RollupBucket) -> datetime:
+    moment = as_utc(moment)
+    if bucket == RollupBucket.minute:
+        return moment.replace(second=0, microsecond=0)
+    if bucket == RollupBucket.hour:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _rollup_deltas(readings: Iterable) -> dict:
+    deltas = {}
+    for reading in readings:
+        if reading.created_at is None:
+            continue
+        for bucket in RollupBucket:
+            key = (bucket.value, bucket_start(reading.created_at, bucket))
+            delta = deltas.get(key)
+            if delta is None:
+                delta = {"bucket_size": key[0], "bucket_start": key[1], "readings_count": 0}
+                for prefix, _ in ROLLUP_METRICS:
+                    delta[f"{prefix}_sum"] = 0.0
+                    delta[f"{prefix}_min"] = None
+                    delta[f"{prefix}_max"] = None
+                deltas[key] = delta
+
+            delta["readings_count"] += 1
+            for prefix, attribute in ROLLUP_METRICS:
+                value = getattr(reading, attribute)
+                delta[f"{prefix}_sum"] += value
+                current_min = delta[f"{prefix}_min"]
+                current_max = delta[f"{prefix}_max"]
+                delta[f"{prefix}_min"] = value if current_min is None else min(current_min, value)
+                delta[f"{prefix}_max"] = value if current_max is None else max(current_max, value)
+    return deltas
+
+
+def _upsert_statement(db: Session, rows: list[dict]):
+    stmt = dialect_insert(db, EnergyRollup).values(rows)
+    lesser, greater = lesser_greater(db)
+
+    table = EnergyRollup.__table__
+    excluded = stmt.excluded
+    set_ = {"readings_count": table.c.readings_count + excluded.readings_count}
+    for prefix, _ in ROLLUP_METRICS:
+        sum_key, min_key, max_key = f"{prefix}_sum", f"{prefix}_min", f"{prefix}_max"
+        set_[sum_key] = table.c[sum_key] + excluded[sum_key]
+        set_[min_key] = lesser(func.coalesce(table.c[min_key], excluded[min_key]), excluded[min_key])
+        set_[max_key] = greater(func.coalesce(table.c[max_key], excluded[max_key]), excluded[max_key])
+
+    return stmt.on_conflict_do_update(index_elements=["bucket_size", "bucket_start"], set_=set_)
+
+
+@event.listens_for(Session, "after_flush")
+def _accumulate_pending_readings(session: Session, flush_context) -> None:
+    readings = session.info.pop(PENDING_READINGS_KEY, None)
+    if not readings:
+        return
+    # Savepoint: uma falha nos rollups descarta so o incremento, a leitura segue no commit
+    savepoint = session.connection().begin_nested()
+    try:
+        EnergyRollupCRUD.accumulate(session, readings)
+        savepoint.commit()
+    except Exception:
+        savepoint.rollback()
+        logger.exception("Falha ao atualizar rollups de energia.")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_readings(session: Session, previous_transaction) -> None:
+    session.info.pop(PENDING_READINGS_KEY, None)
+
+
+class EnergyRollupCRUD:
+
+    @staticmethod
+    def accumulate(db: Session, readings: Iterable) -> int:
+        deltas = _rollup_deltas(readings)
+        if deltas:
+            db.execute(_upsert_statement(db, list(deltas.values())))
+        return len(deltas)
+
+    @staticmethod
+    def record_readings(db: Session, readings: Iterable) -> None:
+        # Chamado antes do commit da leitura: o incremento roda no flush do commit, na mesma
+        # transacao, e leitura e rollup sao confirmados juntos. Um flush explicito aqui tiraria
+        # as leituras de session.new e o DualWriteSession nao as replicaria.
+        # Sem flush no principal (fallback offline) nada e incrementado; rebuild_rollups
+        # recompoe o intervalo depois da sincronizacao.
+        # Nao invalida building_dashboard_cache: leituras chegam o tempo todo e o cache nunca
+        # acertaria. Os KPIs derivados da telemetria ficam defasados no maximo o TTL.
+        db.info.setdefault(PENDING_READINGS_KEY, []).extend(readings)
+
+    @staticmethod
+    def get_rollups(
+        db: Session,
+        bucket: RollupBucket,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 1000,
+    ) -> list[EnergyRollupResponse]:
+        query = db.query(EnergyRollup).filter(EnergyRollup.bucket_size == bucket.value)
+        if since is not None:
+            query = query.filter(EnergyRollup.bucket_start >= bucket_start(since, bucket))
+        if until is not None:
+            query = query.filter(EnergyRollup.bucket_start < as_utc(until))
+        rollups = query.order_by(EnergyRollup.bucket_start.asc()).limit(limit).all()
+        return [EnergyRollupResponse.from_orm(rollup) for rollup in rollups]
+
+    @staticmethod
+    def rebuild_rollups(db: Session, since: datetime, until: datetime) -> int:
+        start = bucket_start(since, RollupBucket.day)
+        end = bucket_start(until, RollupBucket.day)
+        if end < as_utc(until):
+            end += timedelta(days=1)
+
+        if db.get_bind().dialect.name == "postgresql":
+            # Conflita com o ROW EXCLUSIVE dos upserts de record_readings: leituras com
+            # incremento ja feito terminam antes (o DELETE abaixo apaga o incremento e a
+            # varredura as conta), as seguintes esperam este commit e incrementam por cima.
+            # No SQLite o DELETE ja segura o lock de escrita do banco inteiro.
+            db.execute(text(f"LOCK TABLE {EnergyRollup.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+
+        db.query(EnergyRollup).filter(
+            and_(EnergyRollup.bucket_start >= start, EnergyRollup.bucket_start < end)
+        ).delete(synchronize_session=False)
+
+        statement = (
+            select(Energy.created_at, Energy.energy_generated, Energy.energy_consumed, Energy.energy_stored)
+            .where(and_(Energy.created_at >= start, Energy.created_at < end))
+            .execution_options(stream_results=True, yield_per=REBUILD_BATCH_SIZE)
+        )
+        total = 0
+        for partition in db.execute(statement).partitions():
+            EnergyRollupCRUD.accumulate(db, partition)
+            total += len(partition)
+
+        db.commit()
+        building_dashboard_cache.invalidate()
+        return total
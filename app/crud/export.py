@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from app import SessionLocal
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _export_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    value = _export_value(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def export_statement(model, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    statement = select(*model.__table__.columns)
+    if since is not None:
+        statement = statement.where(model.created_at >= since)
+    if until is not None:
+        statement = statement.where(model.created_at < until)
+    return statement.order_by(model.created_at.asc(), model.id.asc())
+
+
+def stream_export(statement, export_format: str) -> Iterator[str]:
+    """
+    Gera o export em blocos de EXPORT_BATCH_SIZE linhas usando um cursor no servidor.
+
+    A sessao e aberta dentro do gerador porque ele e consumido pela StreamingResponse
+    depois que o handler ja retornou.
+    """
+    session = SessionLocal()
+    try:
+        result = session.execute(
+            statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if export_format == "csv" else None
+
+        if writer is not None:
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+        for partition in result.partitions():
+            buffer.seek(0)
+            buffer.truncate(0)
+            for row in partition:
+                if writer is not None:
+                    writer.writerow([_csv_value(value) for value in row])
+                else:
+                    buffer.write(
+                        json.dumps(
+                            {column: _export_value(value) for column, value in zip(columns, row)},
+                            separators=(",", ":"),
+                        )
+                    )
+                    buffer.write("\n")
+            yield buffer.getvalue()
+    finally:
+        session.close()
@@ -1,9 +1,12 @@
 from app.models.maintenance import Maintenance
 from app.schemas.maintenance import MaintenanceCreate, MaintenanceHistoryItem, MaintenanceStatus
 from app import SessionLocal, get_db, HTTPException, Depends
+from app.core.cache import maintenance_dashboard_cache
 from app.schemas.maintenance import MaintenanceComplete, MaintenanceDashboardResponse
+from app.crud.pagination import keyset_page, split_page
 from sqlalchemy.orm import Session
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from typing import Optional
 
 """
 
@@ -111,7 +114,7 @@ class CrudMaintenance:
         )
         db.add(component)
         db.commit()
-        db.refresh(component)
+        maintenance_dashboard_cache.invalidate()
         return component
 
     @staticmethod
@@ -134,7 +137,7 @@ class CrudMaintenance:
         component.notes = data.notes
 
         db.commit()
-        db.refresh(component)
+        maintenance_dashboard_cache.invalidate()
         return component
 
     @staticmethod
@@ -149,12 +152,25 @@ class CrudMaintenance:
 
 
     @staticmethod
-    def get_all_components(db: Session):
-        return db.query(Maintenance).all()
+    def get_all_components(
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ):
+        query = keyset_page(db.query(Maintenance), Maintenance, since, until, cursor, limit)
+        return split_page(query.all(), limit)
 
 
     @staticmethod
     def maintenance_dashboard(db: Session) -> MaintenanceDashboardResponse:
+        return maintenance_dashboard_cache.get_or_set(
+            "dashboard", lambda: CrudMaintenance._build_maintenance_dashboard(db)
+        )
+
+    @staticmethod
+    def _build_maintenance_dashboard(db: Session) -> MaintenanceDashboardResponse:
 
         components = db.query(Maintenance).all()
 
@@ -205,3 +221,4 @@ class CrudMaintenance:
 
         db.delete(component)
         db.commit()
+        maintenance_dashboard_cache.invalidate()
@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, or_
+
+from app import HTTPException
+
+MAX_PAGE_LIMIT = 5000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("utf-8").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def keyset_page(
+    query,
+    model,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """
+    Restringe uma query (ORM ou select) a uma pagina ordenada por (created_at, id).
+
+    Busca uma linha a mais que o limite para que split_page saiba se ha proxima pagina.
+    Sem limite devolve todas as linhas do filtro, como as listagens faziam antes da
+    paginacao: um cliente que nao le o X-Next-Cursor nao perde linhas em silencio.
+    """
+    if since is not None:
+        query = query.where(model.created_at >= since)
+    if until is not None:
+        query = query.where(model.created_at < until)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                model.created_at > created_at,
+                and_(model.created_at == created_at, model.id > row_id),
+            )
+        )
+    query = query.order_by(model.created_at.asc(), model.id.asc())
+    return query if limit is None else query.limit(limit + 1)
+
+
+def split_page(rows: list, limit: Optional[int]) -> tuple[list, Optional[str]]:
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    if last.created_at is None:
+        return rows, None
+    return rows, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,19 @@
+from sqlalchemy import select
+
+
+def response_statement(model, schema):
+    """
+    SELECT Core apenas com as colunas do schema de resposta (mais created_at, usado no cursor).
+
+    Evita montar objetos ORM e validar cada linha com Pydantic nas listagens grandes.
+    """
+    names = list(schema.model_fields)
+    columns = [getattr(model, name) for name in names]
+    if "created_at" not in names:
+        columns.append(model.created_at)
+    return select(*columns), names
+
+
+def rows_as_dicts(rows, names: list[str]) -> list[dict]:
+    # As colunas do schema vem primeiro no SELECT, entao zip descarta o created_at extra.
+    return [dict(zip(names, row)) for row in rows]
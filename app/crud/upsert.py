@@ -0,0 +1,17 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, model):
+    """INSERT com suporte a ON CONFLICT para o dialeto da sessao (Postgres ou SQLite)."""
+    if db.get_bind().dialect.name == "postgresql":
+        return pg_insert(model)
+    return sqlite_insert(model)
+
+
+def lesser_greater(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.least, func.greatest
+    return func.min, func.max
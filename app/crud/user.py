@@ -1,24 +1,26 @@
+from datetime import datetime
 from typing import Optional
 from sqlalchemy.orm import Session
+from app.crud.pagination import keyset_page, split_page
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse
+from app.core.cache import principal_cache
 from app.core.security import hash_password
 
 
 class CRUDUser:
     @staticmethod
-    def create_user(db: Session, user: UserCreate) -> UserResponse:
+    def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> UserResponse:
         db_user = User(
             name=user.name,
             lastname=user.lastname,
             email=user.email,
             building=user.building,
-            password=hash_password(user.password),
+            password=hashed_password or hash_password(user.password),
             phone=user.phone,
         )
         db.add(db_user)
         db.commit()
-        db.refresh(db_user)
         return UserResponse.from_orm(db_user)
     
     @staticmethod
@@ -36,30 +38,43 @@ class CRUDUser:
         return None
     
     @staticmethod
-    def list_users(db: Session) -> list[UserResponse]:
-        users = db.query(User).all()
-        return [UserResponse.from_orm(user) for user in users]
+    def list_users(
+        db: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[UserResponse], Optional[str]]:
+        query = keyset_page(db.query(User), User, since, until, cursor, limit)
+        users, next_cursor = split_page(query.all(), limit)
+        return [UserResponse.from_orm(user) for user in users], next_cursor
     
     @staticmethod
     def delete_user(db: Session, user_id: int) -> bool:
         db_user = db.query(User).filter(User.id == user_id).first()
         if db_user:
+            email = db_user.email
             db.delete(db_user)
             db.commit()
+            principal_cache.invalidate(email)
             return True
         return False
     
     @staticmethod
-    def update_user(db: Session, user_id: int, user_update: UserCreate) -> Optional[UserResponse]:
+    def update_user(
+        db: Session, user_id: int, user_update: UserCreate, hashed_password: Optional[str] = None
+    ) -> Optional[UserResponse]:
         db_user = db.query(User).filter(User.id == user_id).first()
         if db_user:
+            previous_email = db_user.email
             db_user.name = user_update.name
             db_user.lastname = user_update.lastname
             db_user.email = user_update.email
             db_user.building = user_update.building
-            db_user.password = hash_password(user_update.password)
+            db_user.password = hashed_password or hash_password(user_update.password)
             db_user.phone = user_update.phone
             db.commit()
-            db.refresh(db_user)
+            principal_cache.invalidate(previous_email)
+            principal_cache.invalidate(db_user.email)
             return UserResponse.from_orm(db_user)
         return None
@@ -1,32 +1,71 @@
+import importlib
+import os
+from contextlib import asynccontextmanager
+from typing import Iterable, Optional
+
 from fastapi import FastAPI
-from app import CreateDatabaseTables
-from app.models import battery, alert, maintenance, building, user, energy
-from app.models.alert import ElevatorWorkingAlert
-from app import FastAPI, CORSMiddleware
-from app.routers import energy, batteries, alerts, maintenance, building, users, logs
-
-app = FastAPI(title="SISA API", version="1.0")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from app.crud.pagination import NEXT_CURSOR_HEADER
+
+# (modulo, prefixo, tag) de cada router, na ordem em que sao montados
+ROUTERS = (
+    ("app.routers.energy", "/energy", "energy"),
+    ("app.routers.batteries", "/batery", "batery"),
+    ("app.routers.alerts", "/alerts", "alerts"),
+    ("app.routers.maintenance", "/maintenance", "maintenance"),
+    ("app.routers.building", "/building", "building"),
+    ("app.routers.users", "/users", "users"),
+    ("app.routers.logs", "/logs", "logs"),
 )
 
+# Lista separada por virgula de routers a montar (ex.: "energy,logs"); vazio monta todos
+ENABLED_ROUTERS = os.getenv("ENABLED_ROUTERS", "")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema e responsabilidade de python -m app.core.migrations (release); o boot nao toca o banco.
+    from app.core.config import DB_AUTO_MIGRATE
 
-# Routers
-app.include_router(energy.router, prefix="/energy", tags=["energy"])
-app.include_router(batteries.router, prefix="/batery", tags=["batery"])
-app.include_router(alerts.router, prefix="/alerts", tags=["alerts"])
-app.include_router(maintenance.router, prefix="/maintenance", tags=["maintenance"])
-app.include_router(building.router, prefix="/building", tags=["building"])
-app.include_router(users.router, prefix="/users", tags=["users"])
-app.include_router(logs.router, prefix="/logs", tags=["logs"])
+    if DB_AUTO_MIGRATE:
+        from app.core.migrations import run_migrations
+
+        await run_in_threadpool(run_migrations)
+    yield
 
-CreateDatabaseTables()
 
-@app.get("/")
 async def start():
-    return {"message": "API is running"}
\ No newline at end of file
+    return {"message": "API is running"}
+
+
+def create_app(routers: Optional[Iterable[str]] = None) -> FastAPI:
+    """
+    Monta a aplicacao. routers limita os modulos importados e montados pelo nome
+    (energy, batteries, ...); workers que servem so parte da API nao pagam o import do resto.
+
+    Uso com o factory do uvicorn: uvicorn app.main:create_app --factory
+    """
+    selected = {name.strip() for name in routers if name.strip()} if routers else None
+
+    application = FastAPI(title="SISA API", version="1.0", lifespan=lifespan)
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
+    )
+
+    for module_name, prefix, tag in ROUTERS:
+        if selected is not None and module_name.rsplit(".", 1)[1] not in selected:
+            continue
+        module = importlib.import_module(module_name)
+        application.include_router(module.router, prefix=prefix, tags=[tag])
+
+    application.add_api_route("/", start, methods=["GET"])
+    return application
+
+
+app = create_app(ENABLED_ROUTERS.split(",") if ENABLED_ROUTERS else None)
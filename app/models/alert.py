@@ -1,6 +1,6 @@
 from app import Column, Integer, String, DateTime, Float
 from app import func
-from app import Base
+from app import Base, Index
 from sqlalchemy import Enum as SqlEnum
 from app.schemas.alerts import AlertLevel, AlertStatus
 
@@ -24,6 +24,14 @@ class Alert(Base):
     resolved_at = Column(DateTime(timezone=True), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Mantido pelo servidor a cada UPDATE; e a versao usada nos ETags de alertas
+    updated_at = Column(
+        DateTime(timezone=True), default=func.now(), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        Index("ix_alerts_created_at_id", "created_at", "id"),
+    )
 
 
 class ElevatorWorkingAlert(Base):
@@ -1,6 +1,6 @@
 from app import Column, Integer, DateTime, Float
 from app import func
-from app import Base
+from app import Base, Index
 from sqlalchemy import Enum as SqlEnum
 from app.schemas.battery import BateryType, Statustype, Healthtype
 
@@ -25,4 +25,10 @@ class Battery(Base):
 
     current = Column(Float, nullable=False)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_batteries_created_at_id", "created_at", "id"),
+        # Ultima leitura por bateria: um seek por nome em vez de varrer o historico
+        Index("ix_batteries_battery_name_created_at_id", "battery_name", "created_at", "id"),
+    )
\ No newline at end of file
@@ -1,6 +1,6 @@
 from app import Column, Integer, String, DateTime
 from app import func
-from app import Base
+from app import Base, Index
 from app import JSON, Float, Boolean
 
 class BuildingEnergyTopKPI(Base):
@@ -20,4 +20,21 @@ class BuildingEnergyTopKPI(Base):
     available_for_distribution_kwh = Column(Float, nullable=False)
     unused_percent = Column(Float, nullable=False)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class BuildingEnergyDistributionDaily(Base):
+    __tablename__ = "building_energy_distribution_daily"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Midnight (UTC) of the day being accumulated
+    day_start = Column(DateTime(timezone=True), nullable=False)
+    main_destination = Column(String(100), nullable=False)
+
+    supplied_kwh = Column(Float, nullable=False, default=0)
+    deliveries = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ux_building_energy_distribution_daily", "day_start", "main_destination", unique=True),
+    )
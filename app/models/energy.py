@@ -1,8 +1,10 @@
-from app import Column, Integer, String, DateTime
+from app import Column, Integer, String, DateTime, ForeignKey
+from app import relationship
 from app import func
-from app import Base
+from app import Base, Index
 from app import JSON, Float, Boolean
-
+from sqlalchemy import delete, event, insert, inspect
+from sqlalchemy.orm import Session
 
 
 class ActiveEnergy(Base):
@@ -39,4 +41,94 @@ class Energy(Base):
     # Dictionary like: {"solar": 4.5, "grid": 2.1, "generator": 1.0}
     energy_origin = Column(JSON, nullable=False)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Same data as energy_origin, one row per source, so it can be aggregated in SQL.
+    # Rows are written by _write_origin_readings after the parent INSERT, never through
+    # this collection, so each database derives its own rows once energy.id exists.
+    origin_readings = relationship(
+        "EnergyOriginReading",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        Index("ix_energy_created_at_id", "created_at", "id"),
+    )
+
+
+class EnergyOriginReading(Base):
+    __tablename__ = "energy_origin_readings"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    energy_id = Column(Integer, ForeignKey("energy.id", ondelete="CASCADE"), nullable=False, index=True)
+    source = Column(String(50), nullable=False)
+    amount = Column(Float, nullable=False)
+
+    # Copied from the parent reading so time-range queries need no join
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_energy_origin_readings_created_at_source", "created_at", "source"),
+        Index("ix_energy_origin_readings_source_created_at", "source", "created_at"),
+    )
+
+
+def origin_rows(energy) -> list[dict]:
+    # Aceita um Energy ou uma linha com id, energy_origin e created_at
+    if energy.created_at is None:
+        return []
+    return [
+        {"energy_id": energy.id, "source": source, "amount": amount, "created_at": energy.created_at}
+        for source, amount in (energy.energy_origin or {}).items()
+    ]
+
+
+def _origin_changed(energy) -> bool:
+    attrs = inspect(energy).attrs
+    return attrs.energy_origin.history.has_changes() or attrs.created_at.history.has_changes()
+
+
+@event.listens_for(Session, "after_flush")
+def _write_origin_readings(session: Session, flush_context) -> None:
+    # Roda em qualquer sessao (principal, banco local, replay da fila offline): o snapshot do
+    # DualWriteSession leva so o Energy e cada banco deriva as linhas por fonte no seu flush,
+    # ja com energy_id conhecido.
+    created = [obj for obj in session.new if isinstance(obj, Energy)]
+    changed = [obj for obj in session.dirty if isinstance(obj, Energy) and _origin_changed(obj)]
+    if changed:
+        session.execute(
+            delete(EnergyOriginReading).where(EnergyOriginReading.energy_id.in_([obj.id for obj in changed]))
+        )
+    rows = [row for obj in created + changed for row in origin_rows(obj)]
+    if rows:
+        session.execute(insert(EnergyOriginReading), rows)
+
+
+class EnergyRollup(Base):
+    __tablename__ = "energy_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # "minute", "hour" or "day"
+    bucket_size = Column(String(10), nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+
+    readings_count = Column(Integer, nullable=False, default=0)
+
+    generated_sum = Column(Float, nullable=False, default=0)
+    generated_min = Column(Float, nullable=True)
+    generated_max = Column(Float, nullable=True)
+
+    consumed_sum = Column(Float, nullable=False, default=0)
+    consumed_min = Column(Float, nullable=True)
+    consumed_max = Column(Float, nullable=True)
+
+    stored_sum = Column(Float, nullable=False, default=0)
+    stored_min = Column(Float, nullable=True)
+    stored_max = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ux_energy_rollups_bucket", "bucket_size", "bucket_start", unique=True),
+    )
@@ -1,6 +1,6 @@
 from app import Column, Integer, DateTime, Text, Float, Boolean
 from app import func
-from app import Base
+from app import Base, Index
 from sqlalchemy import Enum as SqlEnum  
 from app.schemas.maintenance import MaintenanceType, MaintenanceStatus
 
@@ -28,4 +28,8 @@ class Maintenance(Base):
     reliability_percent = Column(Float, nullable=True)
     is_overdue = Column(Boolean, nullable=True)
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_maintenances_created_at_id", "created_at", "id"),
+    )
\ No newline at end of file
@@ -1,6 +1,6 @@
 from app import Column, Integer, String, DateTime
 from app import func
-from app import Base
+from app import Base, Index
 
 
 class User(Base):
@@ -19,4 +19,8 @@ class User(Base):
 
     phone = Column(String(30), nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
\ No newline at end of file
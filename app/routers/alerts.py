@@ -1,7 +1,12 @@
-from app import APIRouter, HTTPException, Depends, get_db
+from datetime import datetime
+from typing import Optional
+from app import APIRouter, HTTPException, Depends, get_db, get_async_db, Query, Request, Response, ORJSONResponse
+from app.core.conditional import build_validators, is_not_modified, not_modified_response, set_validators
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.schemas.alerts import AlertCreate, AlertResponse, AlertResolve
-from app.crud.alert import AlertCRUD
+from app.crud.alert import AlertCRUD, AsyncAlertCRUD
+from app.crud.pagination import MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER
 from app.schemas.alerts import ElevatorWorkingAlert, ElevatorWorkingAlertResponse
 
 router = APIRouter()
@@ -36,15 +41,22 @@ async def create_alert(alert: AlertCreate, db: Session = Depends(get_db)):
     return AlertCRUD.create_alert(db, alert)
 
 @router.get("/get_alert_by_id/{alert_id}", response_model=AlertResponse)
-async def get_alert(alert_id: int, db: Session = Depends(get_db)):
+async def get_alert(
+    alert_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Retrieve an alert by ID.
 
     This endpoint fetches a specific alert using its unique identifier.
+    The response carries an ETag; a request whose If-None-Match matches it
+    is answered with 304 Not Modified.
 
     Args:
         alert_id (int): The ID of the alert.
-        db (Session): Database session dependency.
+        db (AsyncSession): Async database session dependency.
 
     Returns:
         AlertResponse: The requested alert.
@@ -52,22 +64,55 @@ async def get_alert(alert_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the alert does not exist.
     """
-    return AlertCRUD.get_alert(db, alert_id)
+    alert = await AsyncAlertCRUD.get_alert(db, alert_id)
+    etag, last_modified = build_validators((alert.id, alert.updated_at))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    return alert
 
 @router.get("/get_all_alerts/", response_model=list[AlertResponse])
-async def get_all_alerts(db: Session = Depends(get_db)):
-    """
-    Retrieve all alerts.
-
-    This endpoint returns a list of all alerts registered in the system.
+async def get_all_alerts(
+    request: Request,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Retrieve alerts, one page at a time.
+
+    This endpoint returns the alerts registered in the system,
+    ordered by creation time and paginated with a cursor. The ETag is
+    derived from a cheap table watermark (row count, max id, max created_at
+    and max updated_at), so a matching If-None-Match is answered with 304
+    without loading or serializing any alert. Rows are selected as plain
+    columns and rendered directly with orjson.
 
     Args:
-        db (Session): Database session dependency.
+        since (datetime, optional): Only records created at or after this instant.
+        until (datetime, optional): Only records created before this instant.
+        cursor (str, optional): Value of the X-Next-Cursor header from the previous page.
+        limit (int, optional): Maximum number of records in the page. Without it
+            every matching record is returned, as before pagination was added.
+        db (AsyncSession): Async database session dependency.
 
     Returns:
-        List[AlertResponse]: A list of all alerts.
-    """
-    return AlertCRUD.get_all_alerts(db)
+        List[AlertResponse]: A page of alerts. When more records exist,
+        the X-Next-Cursor response header carries the cursor of the next page.
+    """
+    watermark = await AsyncAlertCRUD.get_watermark(db)
+    etag, last_modified = build_validators(watermark, request.url.query)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, last_modified)
+
+    alerts, next_cursor = await AsyncAlertCRUD.get_all_alerts(db, since, until, cursor, limit)
+    response = ORJSONResponse(content=alerts)
+    set_validators(response, etag, last_modified)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
 
 @router.put("/resolve/{alert_id}", response_model=AlertResponse)
 async def resolve_alert(alert_id: int, alert_resolve: AlertResolve, db: Session = Depends(get_db)):
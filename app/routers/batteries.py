@@ -1,10 +1,16 @@
-from app import APIRouter
+from datetime import datetime
+from typing import Literal, Optional
+from app import APIRouter, Query, Request, Response, StreamingResponse, ORJSONResponse
+from app.core.conditional import build_validators, is_not_modified, not_modified_response, set_validators
 from app import HTTPException
-from app.crud.battery import BatteryCRUD
+from app.crud.battery import AsyncBatteryCRUD, BatteryCRUD
+from app.crud.export import EXPORT_MEDIA_TYPES
+from app.crud.pagination import MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER
 from app.schemas.battery import BatteryCreate, BatteryResponse
 from app import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app import get_db
+from app import get_db, get_async_db
 
 router = APIRouter()
 
@@ -39,32 +45,85 @@ async def create_battery(battery: BatteryCreate, db: Session = Depends(get_db)):
     return crud.create_battery(db, battery)
 
 @router.get("/list_batteries", response_model=list[BatteryResponse])
-async def list_batteries(db: Session = Depends(get_db)):
+async def list_batteries(
+    request: Request,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    Retrieve all batteries.
+    Retrieve batteries, one page at a time.
 
-    This endpoint returns a list of all batteries registered in the system.
+    This endpoint returns the battery readings registered in the system,
+    ordered by creation time and paginated with a cursor. The ETag is
+    derived from a cheap table watermark (row count, max id and max
+    created_at), so a matching If-None-Match is answered with 304 without
+    loading or serializing any battery. Rows are selected as plain columns
+    and rendered directly with orjson.
 
     Args:
-        db (Session): Database session dependency.
+        since (datetime, optional): Only records created at or after this instant.
+        until (datetime, optional): Only records created before this instant.
+        cursor (str, optional): Value of the X-Next-Cursor header from the previous page.
+        limit (int, optional): Maximum number of records in the page. Without it
+            every matching record is returned, as before pagination was added.
+        db (AsyncSession): Async database session dependency.
 
     Returns:
-        List[BatteryResponse]: A list of all batteries.
+        List[BatteryResponse]: A page of batteries. When more records exist,
+        the X-Next-Cursor response header carries the cursor of the next page.
     """
-    crud = BatteryCRUD()
-    return crud.get_all_batteries(db)
+    watermark = await AsyncBatteryCRUD.get_watermark(db)
+    etag, last_modified = build_validators(watermark, request.url.query)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, last_modified)
+
+    batteries, next_cursor = await AsyncBatteryCRUD.get_all_batteries(db, since, until, cursor, limit)
+    response = ORJSONResponse(content=batteries)
+    set_validators(response, etag, last_modified)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+@router.get("/latest_batteries", response_model=list[BatteryResponse])
+async def latest_batteries(db: AsyncSession = Depends(get_async_db)):
+    """
+    Retrieve the most recent reading of each battery.
+
+    This endpoint returns one reading per battery name, the newest one,
+    so clients do not need to download the battery history to show the
+    current status. Each battery is resolved with a single index seek on
+    (battery_name, created_at, id), so the cost does not grow with the
+    history size, and results are kept in a short-lived in-process cache
+    that is refreshed whenever a battery reading is created.
+
+    Args:
+        db (AsyncSession): Async database session dependency.
+
+    Returns:
+        List[BatteryResponse]: The latest reading of every battery that has one.
+    """
+    return ORJSONResponse(content=await AsyncBatteryCRUD.get_latest_batteries(db))
 
 @router.get("/get_battery/{battery_id}", response_model=BatteryResponse)
-async def get_battery(battery_id: int, db: Session = Depends(get_db)):
+async def get_battery(
+    battery_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Retrieve a battery by ID.
 
     This endpoint fetches detailed information about a battery
-    using its unique identifier.
+    using its unique identifier. The response carries an ETag; a request
+    whose If-None-Match matches it is answered with 304 Not Modified.
 
     Args:
         battery_id (int): The ID of the battery.
-        db (Session): Database session dependency.
+        db (AsyncSession): Async database session dependency.
 
     Returns:
         BatteryResponse: The requested battery.
@@ -72,8 +131,12 @@ async def get_battery(battery_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the battery is not found.
     """
-    crud = BatteryCRUD()
-    return crud.get_battery(db, battery_id)
+    battery = await AsyncBatteryCRUD.get_battery(db, battery_id)
+    etag, last_modified = build_validators((battery.id, battery.created_at))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    return battery
 
 @router.get("/get_batteries_by_name/{battery_name}", response_model=list[BatteryResponse])
 async def get_batteries_by_name(battery_name: str, db: Session = Depends(get_db)):
@@ -92,3 +155,30 @@ async def get_batteries_by_name(battery_name: str, db: Session = Depends(get_db)
     """
     crud = BatteryCRUD()
     return crud.get_all_batteries_by_the_name(db, battery_name)
+
+@router.get("/export_batteries")
+async def export_batteries(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Export battery history as a stream.
+
+    This endpoint streams every battery reading in the requested time range
+    as NDJSON or CSV. Rows are read from a server-side cursor in batches,
+    so memory usage stays constant regardless of the export size.
+
+    Args:
+        export_format (str): Output format, "ndjson" or "csv".
+        since (datetime, optional): Only readings created at or after this instant.
+        until (datetime, optional): Only readings created before this instant.
+
+    Returns:
+        StreamingResponse: The exported battery readings.
+    """
+    return StreamingResponse(
+        BatteryCRUD.export_batteries(since, until, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="batteries.{export_format}"'},
+    )
@@ -1,6 +1,8 @@
 from app import APIRouter, HTTPException, Depends, get_db
 from sqlalchemy.orm import Session
+from datetime import datetime
 from app.schemas.building import BuildingEnergyTopKPICreate, BuildingEnergyDashboardResponse
+from app.schemas.energy import BuildingEnergyCreate, BuildingEnergyResponse
 from app.crud.building import BuildingCRUD as CrudBuilding
 
 router = APIRouter()
@@ -17,13 +19,21 @@ async def running():
     """
     return {"message": "building is running"}
 
-@router.get("/{building_id}/energy-dashboard")
+@router.get("/{building_id}/energy-dashboard", response_model=BuildingEnergyDashboardResponse)
 async def building_energy_dashboard(building_id: int, db: Session = Depends(get_db)):
     """
     Retrieve building energy dashboard.
 
     This endpoint returns the main energy performance indicators (Top KPIs)
     for a specific building, typically used to populate dashboards and reports.
+    The KPIs are derived by the API from the daily energy rollups and the
+    distribution totals of the day, compared with the average daily surplus
+    of the previous days pro-rated to the part of today already elapsed.
+    Energy readings and distributions are not tagged with a building, so the
+    KPIs are site-wide: every existing building ID returns the same values,
+    and the ID only has to exist. Responses are cached for
+    DASHBOARD_CACHE_TTL_SECONDS: building and distribution writes refresh
+    them right away, new energy readings once the entry expires.
 
     Args:
         building_id (int): The ID of the building.
@@ -34,16 +44,60 @@ async def building_energy_dashboard(building_id: int, db: Session = Depends(get_
     """
     return CrudBuilding.get_building_energy_top_kpi(db, building_id)
 
-@router.post("/energy-top-kpi", status_code=201)
+@router.post("/energy-distribution", response_model=BuildingEnergyResponse, status_code=201)
+async def create_building_energy(data: BuildingEnergyCreate, db: Session = Depends(get_db)):
+    """
+    Register energy supplied to a destination.
+
+    This endpoint records energy distributed from the building surplus to a
+    destination and updates the daily distribution totals used by the
+    energy dashboard.
+
+    Args:
+        data (BuildingEnergyCreate): Supplied energy and its main destination.
+        db (Session): Database session dependency.
+
+    Returns:
+        BuildingEnergyResponse: The created distribution record.
+    """
+    return CrudBuilding.create_building_energy(db, data)
+
+@router.post("/energy-distribution/rebuild")
+async def rebuild_building_energy_distribution(since: datetime, until: datetime, db: Session = Depends(get_db)):
+    """
+    Rebuild daily distribution totals from raw distribution records.
+
+    This endpoint recomputes the per-day, per-destination totals used by the
+    energy dashboard (widened to whole days) from the distribution table.
+    Use it after distributions were written outside of the API, such as
+    offline replays, or after a totals update failed. New distributions wait
+    for the rebuild to commit before updating their totals.
+
+    Args:
+        since (datetime): Start of the range to rebuild.
+        until (datetime): End of the range to rebuild.
+        db (Session): Database session dependency.
+
+    Returns:
+        dict: Number of distribution records aggregated.
+    """
+    if until <= since:
+        raise HTTPException(status_code=400, detail="until must be after since")
+    total = CrudBuilding.rebuild_distribution(db, since, until)
+    return {"message": "Distribution totals rebuilt successfully", "distributions": total}
+
+@router.post("/energy-top-kpi", status_code=201, deprecated=True)
 async def create_building_energy_top_kpi(
     data: BuildingEnergyTopKPICreate,
     db: Session = Depends(get_db)
 ):
     """
-    Create building energy Top KPI.
+    Create building energy Top KPI (deprecated).
 
     This endpoint creates a new energy KPI entry for a building,
     such as consumption, efficiency, peak usage, or sustainability metrics.
+    Deprecated: the energy dashboard derives its KPIs from the energy
+    rollups and ignores the values stored here.
 
     Args:
         data (BuildingEnergyTopKPICreate): Energy KPI data.
@@ -54,17 +108,18 @@ async def create_building_energy_top_kpi(
     """
     return CrudBuilding.create_building_energy_top_kpi(db, data)
 
-@router.put("/energy-top-kpi/{kpi_id}")
+@router.put("/energy-top-kpi/{kpi_id}", deprecated=True)
 async def update_building_energy_top_kpi(
     kpi_id: int,
     data: BuildingEnergyTopKPICreate,
     db: Session = Depends(get_db)
 ):
     """
-    Update building energy Top KPI.
+    Update building energy Top KPI (deprecated).
 
     This endpoint updates an existing energy KPI record
-    identified by its unique KPI ID.
+    identified by its unique KPI ID. Deprecated: the energy dashboard
+    derives its KPIs from the energy rollups and ignores the values stored here.
 
     Args:
         kpi_id (int): The ID of the KPI to update.
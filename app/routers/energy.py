@@ -1,6 +1,14 @@
-from app import APIRouter, Depends, get_db, HTTPException, SessionLocal
-from app.schemas.energy import EnergyCreate, EnergyResponse
-from app.crud.energy import EnergyCRUD
+from datetime import datetime
+from typing import Any, Literal, Optional
+from fastapi.concurrency import run_in_threadpool
+from app import APIRouter, Depends, get_db, get_async_db, HTTPException, SessionLocal, Query, StreamingResponse, ORJSONResponse
+from app.schemas.energy import EnergyCreate, EnergyResponse, EnergyBulkResponse, EnergyRollupResponse, RollupBucket
+from app.schemas.energy import EnergyOriginTotal, EnergyAnalyticsResponse
+from app.crud.energy import AsyncEnergyCRUD, EnergyCRUD
+from app.crud.energy_origin import EnergyOriginCRUD
+from app.crud.energy_rollup import EnergyRollupCRUD
+from app.crud.export import EXPORT_MEDIA_TYPES
+from app.crud.pagination import MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
@@ -34,8 +42,31 @@ async def create_energy(energy: EnergyCreate, db=Depends(get_db)):
     crud = EnergyCRUD()
     return crud.create_energy(db, energy)
 
+@router.post("/create_energy_bulk", response_model=EnergyBulkResponse)
+async def create_energy_bulk(readings: list[dict[str, Any]], db=Depends(get_db)):
+    """
+    Create many energy records in a single request.
+
+    This endpoint ingests a batch of readings pushed by inverters and meters.
+    Every row is validated against EnergyCreate in one pass, and the valid
+    rows are written in a single transaction. Invalid rows are reported
+    individually and do not prevent the valid ones from being stored.
+
+    Args:
+        readings (List[dict]): Raw energy readings, one EnergyCreate per item.
+        db (Session): Database session dependency.
+
+    Returns:
+        EnergyBulkResponse: Per-row ids or validation errors, in request order.
+
+    Raises:
+        HTTPException: If the batch exceeds the maximum allowed size.
+    """
+    crud = EnergyCRUD()
+    return crud.create_energy_bulk(db, readings)
+
 @router.get("/get_energy/{energy_id}", response_model=EnergyResponse)
-async def get_energy(energy_id: int, db=Depends(get_db)):
+async def get_energy(energy_id: int, db=Depends(get_async_db)):
     """
     Retrieve energy data by ID.
 
@@ -43,7 +74,7 @@ async def get_energy(energy_id: int, db=Depends(get_db)):
 
     Args:
         energy_id (int): The ID of the energy record.
-        db (Session): Database session dependency.
+        db (AsyncSession): Async database session dependency.
 
     Returns:
         EnergyResponse: The requested energy record.
@@ -51,22 +82,213 @@ async def get_energy(energy_id: int, db=Depends(get_db)):
     Raises:
         HTTPException: If the energy record is not found.
     """
-    crud = EnergyCRUD()
-    return crud.get_energy(db, energy_id)
+    return await AsyncEnergyCRUD.get_energy(db, energy_id)
 
 @router.get("/list_energy", response_model=list[EnergyResponse])    
-async def list_energy(db=Depends(get_db)):
+async def list_energy(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    db=Depends(get_async_db),
+):
+    """
+    Retrieve energy records, one page at a time.
+
+    This endpoint returns stored energy records ordered by creation time,
+    useful for analytics, dashboards, and reporting. Pages are cursor based,
+    so the cost of a page does not grow with the size of the table.
+    Rows are selected as plain columns and rendered directly with orjson,
+    without building ORM objects or validating each row again.
+
+    Args:
+        since (datetime, optional): Only records created at or after this instant.
+        until (datetime, optional): Only records created before this instant.
+        cursor (str, optional): Value of the X-Next-Cursor header from the previous page.
+        limit (int, optional): Maximum number of records in the page. Without it
+            every matching record is returned, as before pagination was added.
+        db (AsyncSession): Async database session dependency.
+
+    Returns:
+        List[EnergyResponse]: A page of energy records. When more records exist,
+        the X-Next-Cursor response header carries the cursor of the next page.
+    """
+    energies, next_cursor = await AsyncEnergyCRUD.get_all_energy(db, since, until, cursor, limit)
+    response = ORJSONResponse(content=energies)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+@router.get("/export_energy")
+async def export_energy(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Export energy history as a stream.
+
+    This endpoint streams every energy record in the requested time range
+    as NDJSON or CSV. Rows are read from a server-side cursor in batches,
+    so memory usage stays constant regardless of the export size.
+
+    Args:
+        export_format (str): Output format, "ndjson" or "csv".
+        since (datetime, optional): Only records created at or after this instant.
+        until (datetime, optional): Only records created before this instant.
+
+    Returns:
+        StreamingResponse: The exported energy records.
+    """
+    return StreamingResponse(
+        EnergyCRUD.export_energy(since, until, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="energy.{export_format}"'},
+    )
+
+@router.get("/rollups", response_model=list[EnergyRollupResponse])
+async def get_energy_rollups(
+    bucket: RollupBucket = RollupBucket.hour,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db=Depends(get_db),
+):
     """
-    Retrieve all energy records.
+    Retrieve aggregated energy buckets.
 
-    This endpoint returns a list of all stored energy records,
-    useful for analytics, dashboards, and reporting.
+    This endpoint returns pre-aggregated energy data (sum, min, max and
+    reading count of generated, consumed and stored energy) per minute,
+    hour or day. Buckets are maintained as readings arrive, so charts
+    read one row per bucket instead of every raw reading.
 
     Args:
+        bucket (RollupBucket): Bucket size: "minute", "hour" or "day".
+        since (datetime, optional): Only buckets containing or after this instant.
+        until (datetime, optional): Only buckets starting before this instant.
+        limit (int): Maximum number of buckets returned.
         db (Session): Database session dependency.
 
     Returns:
-        List[EnergyResponse]: A list of energy records.
+        List[EnergyRollupResponse]: Buckets ordered by start time.
     """
-    crud = EnergyCRUD()
-    return crud.get_all_energy(db)
\ No newline at end of file
+    return EnergyRollupCRUD.get_rollups(db, bucket, since, until, limit)
+
+@router.post("/rollups/rebuild")
+async def rebuild_energy_rollups(since: datetime, until: datetime, db=Depends(get_db)):
+    """
+    Rebuild energy buckets from raw readings.
+
+    This endpoint recomputes every bucket in the given range (widened to
+    whole days) from the raw energy table. Use it after readings were
+    written outside of the API, such as offline replays or imports. New
+    readings wait for the rebuild to commit before updating their buckets.
+
+    Args:
+        since (datetime): Start of the range to rebuild.
+        until (datetime): End of the range to rebuild.
+        db (Session): Database session dependency.
+
+    Returns:
+        dict: Number of raw readings aggregated.
+    """
+    if until <= since:
+        raise HTTPException(status_code=400, detail="until must be after since")
+    total = EnergyRollupCRUD.rebuild_rollups(db, since, until)
+    return {"message": "Energy rollups rebuilt successfully", "readings": total}
+
+@router.get("/origin_breakdown", response_model=list[EnergyOriginTotal])
+async def get_energy_origin_breakdown(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    source: Optional[str] = None,
+    db=Depends(get_db),
+):
+    """
+    Retrieve energy totals per origin.
+
+    This endpoint sums the energy contributed by each origin (solar, grid,
+    generator, ...) over a time range. The aggregation runs in the database
+    over the per-source rows stored alongside every energy record.
+
+    Args:
+        since (datetime, optional): Only records created at or after this instant.
+        until (datetime, optional): Only records created before this instant.
+        source (str, optional): Restrict the breakdown to a single origin.
+        db (Session): Database session dependency.
+
+    Returns:
+        List[EnergyOriginTotal]: Total energy and reading count per origin.
+    """
+    return EnergyOriginCRUD.get_breakdown(db, since, until, source)
+
+@router.post("/origin_breakdown/backfill")
+async def backfill_energy_origin_breakdown(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db=Depends(get_db),
+):
+    """
+    Rebuild per-origin rows from stored energy records.
+
+    This endpoint regenerates the per-source rows from the energy_origin
+    field of existing records, for data written before the breakdown
+    existed or imported outside of the API.
+
+    Args:
+        since (datetime, optional): Only records created at or after this instant.
+        until (datetime, optional): Only records created before this instant.
+        db (Session): Database session dependency.
+
+    Returns:
+        dict: Number of energy records processed.
+    """
+    total = EnergyOriginCRUD.backfill(db, since, until)
+    return {"message": "Energy origin breakdown rebuilt successfully", "records": total}
+
+@router.get("/analytics", response_model=EnergyAnalyticsResponse)
+async def get_energy_analytics(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    window: int = Query(60, ge=1, le=100000),
+    peak_sigma: float = Query(2.0, ge=0),
+    max_points: int = Query(500, ge=1, le=10000),
+    db=Depends(get_db),
+):
+    """
+    Retrieve energy analytics for a time window.
+
+    This endpoint loads the energy series of the window as NumPy arrays and
+    computes self-consumption and self-sufficiency ratios, surplus and
+    deficit totals, rolling averages and consumption peaks in a vectorized way.
+    Without bounds the window is the last ANALYTICS_DEFAULT_WINDOW_DAYS days
+    (7 by default); windows longer than ANALYTICS_MAX_WINDOW_DAYS (31 by
+    default) are rejected, so the cost does not grow with the history size.
+
+    Args:
+        since (datetime, optional): Start of the analysed window.
+        until (datetime, optional): End of the analysed window.
+        window (int): Number of readings in each rolling average.
+        peak_sigma (float): Standard deviations above the mean for a peak.
+        max_points (int): Maximum number of rolling average points returned.
+        db (Session): Database session dependency.
+
+    Returns:
+        EnergyAnalyticsResponse: The computed metrics and the analysed window.
+
+    Raises:
+        HTTPException: 400 if the window is inverted or too long.
+    """
+    def compute():
+        # NumPy so e carregado na primeira chamada, fora do boot do worker
+        from app.analytics.energy import compute_energy_metrics, load_energy_window, resolve_window
+
+        try:
+            window_start, window_end = resolve_window(since, until)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        series = load_energy_window(db, window_start, window_end)
+        metrics = compute_energy_metrics(series, window=window, peak_sigma=peak_sigma, max_points=max_points)
+        return {**metrics, "since": window_start, "until": window_end}
+
+    return await run_in_threadpool(compute)
@@ -1,7 +1,103 @@
-from app import APIRouter
+import logging
+
+from app import APIRouter, HTTPException
+from app.core.config import sync_queue_status
+from app.core.cache import cache_stats
+from app.core.pool import pool_status
+from app.core.replication import replication_status
+from app.core.security import password_hasher
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.get("/")
 async def running():
     return {"message": "logs is running"}
+
+@router.get("/pool")
+async def get_pool_status():
+    """
+    Retrieve connection pool statistics.
+
+    This endpoint reports, for every database engine in use, the configured
+    pool settings, the connections currently checked in and out, the overflow
+    in use and how long requests waited to obtain a connection. Growing wait
+    times or timeouts indicate pool exhaustion.
+
+    Returns:
+        dict: Pool statistics per engine.
+    """
+    return pool_status()
+
+@router.get("/cache")
+async def get_cache_stats():
+    """
+    Retrieve response cache statistics.
+
+    This endpoint reports, for every in-process cache, the number of entries,
+    hits, misses, hit ratio, evictions and invalidations since the worker started.
+
+    Returns:
+        dict: Statistics per cache.
+    """
+    return cache_stats()
+
+@router.get("/replication")
+async def get_replication_status():
+    """
+    Retrieve background replication statistics.
+
+    This endpoint reports, for every background replicator, the queue depth,
+    the age of the oldest pending commit, how many commits were applied or
+    failed and how often a full queue made a request wait for room. It is
+    empty when replication to the local database runs inside the request
+    (DB_REPLICATION_MODE=sync) or no local database is configured.
+
+    Returns:
+        dict: Statistics per replicator.
+    """
+    return replication_status()
+
+@router.get("/password_hashing")
+async def get_password_hashing_status():
+    """
+    Retrieve password hashing pool statistics.
+
+    This endpoint reports the size of the thread pool that hashes and verifies
+    passwords, how many requests are running or waiting for it, how long they
+    waited and how many were rejected with 503 because the wait queue was full.
+    A growing wait time or rejection count means PASSWORD_HASH_WORKERS or
+    PASSWORD_HASH_MAX_QUEUE is too small for the login rate.
+
+    Returns:
+        dict: Password hashing pool statistics.
+    """
+    return password_hasher.status()
+
+@router.get("/sync")
+def get_sync_status():
+    """
+    Retrieve the state of the offline sync queue and of background replication.
+
+    This endpoint reports the number of pending writes, the age of the oldest
+    one, pending writes per model, a histogram of replay attempts, the most
+    recent replay error and how many writes were replayed in the last minute
+    and last 15 minutes. The status is "lagging" when the oldest pending write
+    is older than SYNC_LAG_ALERT_SECONDS, and "disabled" when no local
+    database is configured.
+
+    Returns:
+        dict: Offline queue and replication statistics.
+
+    Raises:
+        HTTPException: 503 if the local database cannot be queried.
+    """
+    try:
+        status = sync_queue_status()
+    except Exception:
+        # Detalhes (URL, SQL, nomes de tabela) ficam so no log do servidor
+        logger.exception("Falha ao consultar a fila de pendencias offline.")
+        raise HTTPException(status_code=503, detail="Offline sync queue unavailable")
+    status["replication"] = replication_status()
+    return status
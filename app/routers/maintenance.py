@@ -1,4 +1,6 @@
-from app import APIRouter, HTTPException, Depends, get_db
+from datetime import datetime
+from typing import Optional
+from app import APIRouter, HTTPException, Depends, get_db, Query, Response
 from sqlalchemy.orm import Session
 from app.schemas.maintenance import (
     MaintenanceCreate,
@@ -7,6 +9,7 @@ from app.schemas.maintenance import (
     MaintenanceHistoryItem
 )
 from app.crud.maintenance import CrudMaintenance
+from app.crud.pagination import MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
@@ -39,19 +42,36 @@ async def maintenance_dashboard(db: Session = Depends(get_db)):
     return CrudMaintenance.maintenance_dashboard(db)
 
 @router.get("/components")
-async def get_components(db: Session = Depends(get_db)):
+async def get_components(
+    response: Response,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    db: Session = Depends(get_db),
+):
     """
-    Retrieve all components.
+    Retrieve components, one page at a time.
 
-    This endpoint returns a list of all components that can have maintenance tasks.
+    This endpoint returns the components that can have maintenance tasks,
+    ordered by creation time and paginated with a cursor.
 
     Args:
+        since (datetime, optional): Only records created at or after this instant.
+        until (datetime, optional): Only records created before this instant.
+        cursor (str, optional): Value of the X-Next-Cursor header from the previous page.
+        limit (int, optional): Maximum number of records in the page. Without it
+            every matching record is returned, as before pagination was added.
         db (Session): Database session dependency.
 
     Returns:
-        List[dict]: List of components.
+        List[dict]: A page of components. When more components exist,
+        the X-Next-Cursor response header carries the cursor of the next page.
     """
-    return CrudMaintenance.get_all_components(db)
+    components, next_cursor = CrudMaintenance.get_all_components(db, since, until, cursor, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return components
 
 @router.post("/components", status_code=201)
 async def create_component(data: MaintenanceCreate, db: Session = Depends(get_db)):
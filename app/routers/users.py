@@ -1,8 +1,11 @@
-from app import APIRouter, Depends, get_db, HTTPException
+from datetime import datetime
+from typing import Optional
+from app import APIRouter, Depends, get_db, HTTPException, Query, Response
 from app.schemas.user import UserCreate, UserResponse, UserLogin, TokenResponse
 from sqlalchemy.orm import Session
 from app.crud.user import CRUDUser
-from app.core.security import create_access_token, get_current_user, verify_password, hash_password
+from app.crud.pagination import MAX_PAGE_LIMIT, NEXT_CURSOR_HEADER
+from app.core.security import create_access_token, get_current_user, hash_password_async, verify_password_async
 
 router = APIRouter()
 
@@ -33,25 +36,41 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
         UserResponse: The newly created user.
     """
     crud = CRUDUser()
-    return crud.create_user(db, user)
+    hashed_password = await hash_password_async(user.password)
+    return crud.create_user(db, user, hashed_password)
 
 @router.get("/list_users", response_model=list[UserResponse])
 async def list_users(
+    response: Response,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
     db: Session = Depends(get_db)
 ):
     """
-    Retrieve all users.
+    Retrieve users, one page at a time.
 
-    This endpoint returns a list of all registered users in the system.
+    This endpoint returns the registered users in the system,
+    ordered by creation time and paginated with a cursor.
 
     Args:
+        since (datetime, optional): Only records created at or after this instant.
+        until (datetime, optional): Only records created before this instant.
+        cursor (str, optional): Value of the X-Next-Cursor header from the previous page.
+        limit (int, optional): Maximum number of records in the page. Without it
+            every matching record is returned, as before pagination was added.
         db (Session): Database session dependency.
 
     Returns:
-        List[UserResponse]: A list containing all users.
+        List[UserResponse]: A page of users. When more users exist,
+        the X-Next-Cursor response header carries the cursor of the next page.
     """
     crud = CRUDUser()
-    return crud.list_users(db)
+    users, next_cursor = crud.list_users(db, since, until, cursor, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return users
 
 @router.delete("/delete_user/{user_id}")
 async def delete_user(
@@ -100,7 +119,8 @@ async def update_user(
         UserResponse: The updated user data.
     """
     crud = CRUDUser()
-    updated_user = crud.update_user(db, user_id, user_update)
+    hashed_password = await hash_password_async(user_update.password)
+    updated_user = crud.update_user(db, user_id, user_update, hashed_password)
 
     if updated_user:
         return updated_user
@@ -123,7 +143,8 @@ async def login(data: UserLogin, db: Session = Depends(get_db)):
         TokenResponse: Access token for authenticated requests.
 
     Raises:
-        HTTPException: If the user is not found or credentials are invalid.
+        HTTPException: If the user is not found or credentials are invalid,
+        or 503 when the password hashing pool is saturated.
     """
     crud = CRUDUser()
     user = crud.get_user_by_email(db, data.email)
@@ -131,16 +152,12 @@ async def login(data: UserLogin, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
-    if not verify_password(data.password, user.password):
+    if not await verify_password_async(data.password, user.password):
         # Compatibilidade: permite login de senhas antigas em texto puro e migra para hash.
         if user.password != data.password:
             raise HTTPException(status_code=401, detail="Invalid email or password")
-        user.password = hash_password(data.password)
+        user.password = await hash_password_async(data.password)
         db.commit()
-        db.refresh(user)
-
-    if not verify_password(data.password, user.password):
-        raise HTTPException(status_code=401, detail="Invalid email or password")
 
     token = create_access_token(subject=user.email)
     return TokenResponse(access_token=token)
@@ -37,6 +37,7 @@ class AlertResponse(BaseModel):
     detected_at: datetime
     resolved_at: Optional[datetime]
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True  
@@ -15,7 +15,7 @@ class BuildingEnergyTopKPICreate(BaseModel):
 class BuildingEnergyDashboardResponse(BaseModel):
     id: int
 
-    urplus_available_kwh: float
+    surplus_available_kwh: float
     surplus_vs_daily_avg_percent: float
 
     currently_distributed_kwh: float
@@ -24,5 +24,6 @@ class BuildingEnergyDashboardResponse(BaseModel):
     available_for_distribution_kwh: float
     unused_percent: float
 
-    class config:
-        orm_mode = True
\ No newline at end of file
+    model_config = {
+        "from_attributes": True
+    }
\ No newline at end of file
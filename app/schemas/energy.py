@@ -1,4 +1,5 @@
-from app import BaseModel, datetime, Optional, Dict
+from typing import List
+from app import BaseModel, datetime, Optional, Dict, Enum
 
 
 # Dashboard Energy Schemas
@@ -49,3 +50,80 @@ class EnergyResponse(BaseModel):
         "from_attributes": True
     }
 
+# Bulk ingestion Schemas
+
+class EnergyBulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class EnergyBulkResponse(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    results: List[EnergyBulkItemResult]
+
+# Rollup Schemas
+
+class RollupBucket(str, Enum):
+    minute = "minute"
+    hour = "hour"
+    day = "day"
+
+
+class EnergyRollupResponse(BaseModel):
+    bucket_size: RollupBucket
+    bucket_start: datetime
+    readings_count: int
+
+    generated_sum: float
+    generated_min: Optional[float] = None
+    generated_max: Optional[float] = None
+
+    consumed_sum: float
+    consumed_min: Optional[float] = None
+    consumed_max: Optional[float] = None
+
+    stored_sum: float
+    stored_min: Optional[float] = None
+    stored_max: Optional[float] = None
+
+    model_config = {
+        "from_attributes": True
+    }
+
+# Origin breakdown Schemas
+
+class EnergyOriginTotal(BaseModel):
+    source: str
+    total: float
+    readings_count: int
+
+# Analytics Schemas
+
+class EnergyRollingPoint(BaseModel):
+    timestamp: datetime
+    generated_avg: float
+    consumed_avg: float
+
+
+class EnergyPeak(BaseModel):
+    timestamp: datetime
+    energy_consumed: float
+
+
+class EnergyAnalyticsResponse(BaseModel):
+    since: datetime
+    until: datetime
+    readings_count: int
+    total_generated: float
+    total_consumed: float
+    self_consumption_ratio: Optional[float] = None
+    self_sufficiency_ratio: Optional[float] = None
+    total_surplus: float
+    total_deficit: float
+    peak_surplus: Optional[float] = None
+    rolling_window: int
+    rolling: List[EnergyRollingPoint]
+    consumption_peaks: List[EnergyPeak]
@@ -0,0 +1,135 @@
+"""
+Compara a replicacao de operacoes no banco local com um session.get por operacao
+(caminho antigo de _apply_operations) e com o pre-carregamento por IN em blocos.
+
+Cada rodada usa um banco novo com metade das linhas ja existentes: 40% das operacoes
+atualizam linhas existentes, 50% inserem linhas novas e 10% apagam.
+
+Uso:
+    python -m benchmarks.apply_operations --operations 1000 100000
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import (
+    _apply_operations,
+    _deserialize_for_column,
+    _model_key,
+    _pk_identity,
+    _pk_values_from_instance,
+    _serialize_for_column,
+)
+from app.models.energy import Energy
+
+
+def legacy_apply_operations(session, operations):
+    persisted = []
+
+    for op in operations:
+        model_cls = op["model_class"]
+        mapper = inspect(model_cls).mapper
+        identity = _pk_identity(op["pk_values"])
+
+        if op["operation"] == "upsert":
+            target = session.get(model_cls, identity) if identity is not None else None
+            if target is None:
+                target = model_cls()
+                session.add(target)
+
+            for col in mapper.columns:
+                if col.key in op["payload"]:
+                    setattr(target, col.key, _deserialize_for_column(op["payload"][col.key], col))
+            persisted.append((op, target))
+            continue
+
+        if op["operation"] == "delete" and identity is not None:
+            target = session.get(model_cls, identity)
+            if target is not None:
+                session.delete(target)
+
+    session.commit()
+
+    for op, obj in persisted:
+        mapper = inspect(obj).mapper
+        op["pk_values"] = _pk_values_from_instance(obj, mapper)
+        op["payload"] = {
+            col.key: _serialize_for_column(getattr(obj, col.key), col)
+            for col in mapper.columns
+        }
+
+
+def build_operations(count: int) -> tuple[list, list]:
+    existing = count // 2
+    seed = [
+        {"id": index, "energy_generated": 1.0, "energy_consumed": 1.0, "energy_stored": 1.0, "energy_origin": {}}
+        for index in range(1, existing + 1)
+    ]
+    operations = []
+    for index in range(count):
+        if index % 10 == 9:
+            pk, operation = index // 2 + 1, "delete"
+        elif index % 10 < 4:
+            pk, operation = index // 2 + 1, "upsert"
+        else:
+            pk, operation = existing + index + 1, "upsert"
+        payload = None
+        if operation == "upsert":
+            payload = {
+                "id": pk,
+                "energy_generated": float(index),
+                "energy_consumed": 2.0,
+                "energy_stored": 3.0,
+                "energy_origin": {"solar": 1.0},
+                "created_at": "2026-01-01T00:00:00",
+            }
+        operations.append(
+            {
+                "operation": operation,
+                "model_class": Energy,
+                "model_key": _model_key(Energy),
+                "pk_values": [pk],
+                "payload": payload,
+                "source_obj": None,
+            }
+        )
+    return seed, operations
+
+
+def run(apply, count: int) -> tuple[float, int]:
+    engine = create_engine("sqlite://")
+    Energy.__table__.create(engine)
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    seed, operations = build_operations(count)
+    with engine.begin() as conn:
+        conn.execute(Energy.__table__.insert(), seed)
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with Session() as session:
+        started = time.perf_counter()
+        apply(session, operations)
+        elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed * 1000, len(statements)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", type=int, nargs="+", default=[1000, 100_000])
+    args = parser.parse_args()
+
+    for count in args.operations:
+        for label, apply in (("session.get por operacao", legacy_apply_operations), ("IN em blocos", _apply_operations)):
+            elapsed, statements = run(apply, count)
+            print(f"{count:>7} operacoes  {label:<26} {elapsed:10.1f} ms  {statements:>7} comandos SQL")
+
+
+if __name__ == "__main__":
+    main()
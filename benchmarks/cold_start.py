@@ -0,0 +1,77 @@
+"""
+Mede o cold start da API: tempo de import de app.main num processo novo e tempo ate a
+primeira resposta do uvicorn para diferentes numeros de workers.
+
+Usa o banco configurado no ambiente (.env / DATABASE_URL). Desde as migracoes
+versionadas o boot nao abre conexao, entao o resultado nao depende da latencia do banco;
+compare com DB_AUTO_MIGRATE=true para ver o custo de migrar no startup.
+
+Uso:
+    python -m benchmarks.cold_start --imports 5 --workers 1 2 4
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def measure_import(runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET], check=True, capture_output=True, text=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]) * 1000)
+    return timings
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_request(workers: int, timeout: float) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f"sem resposta em {timeout}s com {workers} workers")
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--imports", type=int, default=5, help="processos para medir o import")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    imports = measure_import(args.imports)
+    print(f"import app.main: mediana {statistics.median(imports):.0f} ms (min {min(imports):.0f}, max {max(imports):.0f})")
+    for workers in args.workers:
+        elapsed = measure_first_request(workers, args.timeout)
+        print(f"{workers} worker(s): primeira resposta em {elapsed:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Mede a vazao de leituras concorrentes na sessao sincrona (antes) e na assincrona (atual).
+
+Sem --url o benchmark roda em processo: semeia um SQLite em arquivo, sobe a API com
+get_db e get_async_db apontando para ele e dispara as mesmas leituras em duas fases.
+A fase "sessao sincrona" usa um handler como era antes (async def chamando a Session
+sincrona, consulta bloqueando o event loop); a fase "sessao assincrona" usa as rotas
+atuais (/energy/list_energy e /energy/get_energy, via get_async_db). A consulta e a
+mesma nas duas fases, so muda a sessao. O SQLite local responde sem esperar por I/O,
+entao nao ha o que sobrepor; --query-delay-ms simula a ida e volta de um banco remoto,
+que e onde a sessao sincrona trava o loop.
+
+Com --url mede uma instancia ja rodando; rode uma vez contra um build com as rotas
+sincronas e outra contra o build atual, com o mesmo banco e o mesmo numero de workers.
+
+Os numeros do commit que introduziu o modo em processo saem dos dois primeiros comandos
+abaixo (padrao: 100000 leituras, 4000 requests, concorrencia 64, caminhos com semente fixa).
+
+Uso:
+    python -m benchmarks.concurrent_reads
+    python -m benchmarks.concurrent_reads --query-delay-ms 2
+    python -m benchmarks.concurrent_reads --rows 200000 --concurrency 64 --requests 4000
+    uvicorn app.main:app --workers 1 --port 8000
+    python -m benchmarks.concurrent_reads --url http://127.0.0.1:8000 \\
+        --path "/energy/list_energy?limit=100" --path "/batery/list_batteries?limit=100" \\
+        --concurrency 64 --requests 4000
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+from fastapi import Depends
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import Base, DualWriteSession, get_async_db, get_db
+from app.crud.pagination import keyset_page, split_page
+from app.crud.serialization import response_statement, rows_as_dicts
+from app.main import create_app
+from app.models.energy import Energy
+from app.schemas.energy import EnergyResponse
+
+LEGACY_PREFIX = "/bench/sync"
+SEED_BATCH_SIZE = 10_000
+
+
+def seed(path: str, rows: int, start: datetime) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for offset in range(0, rows, SEED_BATCH_SIZE):
+            conn.execute(
+                insert(Energy),
+                [
+                    {
+                        "energy_generated": float(index % 50),
+                        "energy_consumed": float(index % 40),
+                        "energy_stored": float(index % 30),
+                        "energy_origin": {"solar": float(index % 50)},
+                        "created_at": start + timedelta(seconds=index),
+                    }
+                    for index in range(offset, min(offset + SEED_BATCH_SIZE, rows))
+                ],
+            )
+    engine.dispose()
+
+
+def add_query_delay(sync_engine, delay_seconds: float) -> None:
+    # Simula a ida e volta de um banco remoto. A espera roda na thread que executa a consulta:
+    # o proprio event loop na sessao sincrona, a thread do aiosqlite na assincrona.
+    def wait(_statement):
+        time.sleep(delay_seconds)
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if hasattr(dbapi_connection, "await_"):
+            dbapi_connection.await_(dbapi_connection.driver_connection.set_trace_callback(wait))
+        else:
+            dbapi_connection.set_trace_callback(wait)
+
+
+def build_app(path: str, pool_size: int, query_delay: float):
+    # Pool sem teto nas duas fases: a espera por conexao nao entra na medida. No handler
+    # sincrono ela travaria o loop, e com ele o teardown que devolveria as conexoes.
+    session_factory = sessionmaker(
+        bind=create_engine(
+            f"sqlite:///{path}",
+            connect_args={"check_same_thread": False},
+            pool_size=pool_size,
+            max_overflow=-1,
+        ),
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=pool_size, max_overflow=-1)
+    async_session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    if query_delay > 0:
+        add_query_delay(session_factory.kw["bind"], query_delay)
+        add_query_delay(async_engine.sync_engine, query_delay)
+
+    def bench_db():
+        db = DualWriteSession(primary=session_factory(), secondary=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def bench_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    application = create_app(["energy"])
+    application.dependency_overrides[get_db] = bench_db
+    application.dependency_overrides[get_async_db] = bench_async_db
+
+    # Handlers como eram antes: async def com a Session sincrona, mesma consulta das rotas atuais
+    @application.get(f"{LEGACY_PREFIX}/list_energy")
+    async def list_energy_sync(since: Optional[datetime] = None, limit: int = 100, db=Depends(get_db)):
+        statement, names = response_statement(Energy, EnergyResponse)
+        rows, _ = split_page(db.execute(keyset_page(statement, Energy, since, None, None, limit)).all(), limit)
+        return ORJSONResponse(content=rows_as_dicts(rows, names))
+
+    @application.get(f"{LEGACY_PREFIX}/get_energy/{{energy_id}}", response_model=EnergyResponse)
+    async def get_energy_sync(energy_id: int, db=Depends(get_db)):
+        return EnergyResponse.from_orm(db.get(Energy, energy_id))
+
+    return application, async_engine
+
+
+def sample_paths(rows: int, start: datetime, count: int, page: int) -> list[str]:
+    # Metade paginas a partir de um instante aleatorio, metade leituras por id
+    generator = random.Random(0)
+    paths = []
+    for index in range(count):
+        if index % 2:
+            paths.append(f"/energy/get_energy/{generator.randint(1, rows)}")
+        else:
+            since = start + timedelta(seconds=generator.randint(0, max(rows - page, 0)))
+            paths.append(f"/energy/list_energy?limit={page}&since={since.strftime('%Y-%m-%dT%H:%M:%S')}")
+    return paths
+
+
+async def _worker(client: httpx.AsyncClient, paths: list[str], counter: list[int], total: int, latencies: list, errors: list):
+    while True:
+        index = counter[0]
+        if index >= total:
+            return
+        counter[0] += 1
+        path = paths[index % len(paths)]
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as exc:
+            errors.append(type(exc).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def measure(client: httpx.AsyncClient, paths: list[str], concurrency: int, total: int) -> dict:
+    await client.get(paths[0])
+
+    latencies, errors, counter = [], [], [0]
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_worker(client, paths, counter, total, latencies, errors) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "errors": len(errors),
+    }
+
+
+def report(results: list[tuple[str, dict]], concurrency: int, total: int) -> None:
+    print(f"{total} requests, concorrencia {concurrency}")
+    print(f"{'fase':20} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'erros':>6}")
+    for name, result in results:
+        print(
+            f"{name:20} {result['throughput']:9.1f} {result['p50_ms']:9.1f} {result['p95_ms']:9.1f} "
+            f"{result['max_ms']:9.1f} {result['errors']:6d}"
+        )
+
+
+async def run_remote(args) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        result = await measure(client, args.paths or ["/energy/list_energy?limit=100"], args.concurrency, args.requests)
+    report([(args.url, result)], args.concurrency, args.requests)
+
+
+async def run_in_process(args) -> None:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        seed(path, args.rows, start)
+        application, async_engine = build_app(path, args.concurrency, args.query_delay_ms / 1000)
+        paths = sample_paths(args.rows, start, args.requests, args.page)
+        legacy_paths = [LEGACY_PREFIX + path.removeprefix("/energy") for path in paths]
+
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            results = [
+                ("sessao sincrona", await measure(client, legacy_paths, args.concurrency, args.requests)),
+                ("sessao assincrona", await measure(client, paths, args.concurrency, args.requests)),
+            ]
+        await async_engine.dispose()
+
+    print(
+        f"SQLite em arquivo, {args.rows} leituras de energia, paginas de {args.page}, "
+        f"{args.query_delay_ms:g} ms simulados por consulta"
+    )
+    report(results, args.concurrency, args.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="instancia ja rodando (padrao: API em processo com SQLite semeado)")
+    parser.add_argument("--path", action="append", dest="paths", help="so com --url")
+    parser.add_argument("--rows", type=int, default=100_000, help="so em processo")
+    parser.add_argument("--page", type=int, default=100, help="so em processo")
+    parser.add_argument(
+        "--query-delay-ms", type=float, default=0.0, help="so em processo: latencia de rede simulada por consulta"
+    )
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=4000)
+    args = parser.parse_args()
+    if not args.url and importlib.util.find_spec("aiosqlite") is None:
+        parser.error("o modo em processo usa sqlite+aiosqlite: pip install -r requirements.txt, ou passe --url")
+    asyncio.run(run_remote(args) if args.url else run_in_process(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Compara o calculo de metricas de energia por linha (loop sobre objetos, como os
+scripts ad-hoc que iteram EnergyResponse) com o caminho vetorizado de app.analytics,
+e mede a carga da janela do banco: o caminho antigo (datetime por linha convertido no
+Python) contra o atual (segundos Unix calculados no SQL e um unico fromiter).
+
+Uso:
+    python -m benchmarks.energy_analytics --rows 1000000 --window 60
+    python -m benchmarks.energy_analytics --db-rows 500000 --url postgresql://...
+"""
+import argparse
+import math
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.analytics.energy import compute_energy_metrics, load_energy_window
+from app.core.config import Base
+from app.models.energy import Energy
+
+
+def synthetic_series(rows: int, seed: int = 42) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    timestamps = 1_700_000_000.0 + np.arange(rows, dtype=np.float64) * 5.0
+    daylight = np.clip(np.sin((timestamps % 86400) / 86400 * 2 * np.pi - np.pi / 2), 0, None)
+    generated = daylight * 8.0 + rng.normal(0, 0.3, rows).clip(0)
+    consumed = 3.0 + rng.gamma(2.0, 0.8, rows)
+    stored = rng.uniform(0, 10, rows)
+    return {"timestamps": timestamps, "generated": generated, "consumed": consumed, "stored": stored}
+
+
+def naive_metrics(records: list, window: int, peak_sigma: float) -> dict:
+    total_generated = total_consumed = total_self = surplus_pos = surplus_neg = 0.0
+    rolling_gen, rolling_cons = deque(), deque()
+    sum_gen = sum_cons = 0.0
+    rolling = []
+    for record in records:
+        total_generated += record.energy_generated
+        total_consumed += record.energy_consumed
+        total_self += min(record.energy_generated, record.energy_consumed)
+        surplus = record.energy_generated - record.energy_consumed
+        if surplus > 0:
+            surplus_pos += surplus
+        else:
+            surplus_neg -= surplus
+
+        rolling_gen.append(record.energy_generated)
+        rolling_cons.append(record.energy_consumed)
+        sum_gen += record.energy_generated
+        sum_cons += record.energy_consumed
+        if len(rolling_gen) > window:
+            sum_gen -= rolling_gen.popleft()
+            sum_cons -= rolling_cons.popleft()
+        if len(rolling_gen) == window:
+            rolling.append((sum_gen / window, sum_cons / window))
+
+    mean = total_consumed / len(records)
+    variance = sum((record.energy_consumed - mean) ** 2 for record in records) / len(records)
+    threshold = mean + peak_sigma * math.sqrt(variance)
+    peaks = [
+        index
+        for index in range(1, len(records) - 1)
+        if records[index].energy_consumed > records[index - 1].energy_consumed
+        and records[index].energy_consumed >= records[index + 1].energy_consumed
+        and records[index].energy_consumed > threshold
+    ]
+
+    return {
+        "self_consumption_ratio": total_self / total_generated,
+        "total_surplus": surplus_pos,
+        "total_deficit": surplus_neg,
+        "rolling_points": len(rolling),
+        "peaks": len(peaks),
+    }
+
+
+def seed(session, series: dict, start: datetime) -> None:
+    session.bulk_insert_mappings(
+        Energy,
+        [
+            {
+                "energy_generated": float(gen),
+                "energy_consumed": float(cons),
+                "energy_stored": float(sto),
+                "energy_origin": {},
+                "created_at": start + timedelta(seconds=index * 5),
+            }
+            for index, (gen, cons, sto) in enumerate(zip(series["generated"], series["consumed"], series["stored"]))
+        ],
+    )
+    session.commit()
+
+
+def legacy_load(session, since: datetime, until: datetime) -> dict:
+    # Carga anterior: created_at como datetime e .timestamp() por linha no Python
+    rows = session.execute(
+        select(Energy.created_at, Energy.energy_generated, Energy.energy_consumed, Energy.energy_stored)
+        .where(Energy.created_at >= since, Energy.created_at < until)
+        .order_by(Energy.created_at.asc(), Energy.id.asc())
+    ).all()
+    created_at, generated, consumed, stored = zip(*rows)
+    return {
+        "timestamps": np.fromiter(
+            (moment.replace(tzinfo=timezone.utc).timestamp() if moment.tzinfo is None else moment.timestamp()
+             for moment in created_at),
+            dtype=np.float64,
+            count=len(rows),
+        ),
+        "generated": np.asarray(generated, dtype=np.float64),
+        "consumed": np.asarray(consumed, dtype=np.float64),
+        "stored": np.asarray(stored, dtype=np.float64),
+    }
+
+
+def best_of(fn, *args, repeat: int = 3) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def bench_load(url: str, rows: int, window: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[Energy.__table__])
+    session = sessionmaker(bind=engine)()
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    session.query(Energy).delete()
+    seed(session, synthetic_series(rows), start)
+    since, until = start, start + timedelta(seconds=rows * 5)
+
+    legacy_seconds, legacy = best_of(legacy_load, session, since, until)
+    load_seconds, series = best_of(load_energy_window, session, since, until)
+    compute_seconds, _ = best_of(compute_energy_metrics, series, window)
+    assert series["timestamps"].size == rows
+    assert np.allclose(series["timestamps"], legacy["timestamps"])
+    assert np.array_equal(series["consumed"], legacy["consumed"])
+
+    print(f"\nload from {engine.dialect.name}, {rows} rows")
+    print(f"legacy load:       {legacy_seconds * 1000:10.1f} ms")
+    print(f"load_energy_window:{load_seconds * 1000:10.1f} ms")
+    print(f"load + compute:    {(load_seconds + compute_seconds) * 1000:10.1f} ms "
+          f"(antes {(legacy_seconds + compute_seconds) * 1000:.1f} ms)")
+    session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--peak-sigma", type=float, default=2.0)
+    parser.add_argument("--db-rows", type=int, default=200_000, help="linhas gravadas para medir a carga")
+    parser.add_argument("--url", default="sqlite://", help="URL do banco (padrao: SQLite em memoria)")
+    args = parser.parse_args()
+
+    series = synthetic_series(args.rows)
+    records = [
+        SimpleNamespace(energy_generated=float(gen), energy_consumed=float(cons), energy_stored=float(sto))
+        for gen, cons, sto in zip(series["generated"], series["consumed"], series["stored"])
+    ]
+
+    started = time.perf_counter()
+    naive = naive_metrics(records, args.window, args.peak_sigma)
+    naive_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = compute_energy_metrics(series, window=args.window, peak_sigma=args.peak_sigma, max_peaks=args.rows)
+    vectorized_seconds = time.perf_counter() - started
+
+    assert math.isclose(naive["self_consumption_ratio"], vectorized["self_consumption_ratio"], rel_tol=1e-9)
+    assert math.isclose(naive["total_surplus"], vectorized["total_surplus"], rel_tol=1e-9)
+    assert naive["peaks"] == len(vectorized["consumption_peaks"])
+
+    print(f"rows:        {args.rows}")
+    print(f"per-row:     {naive_seconds * 1000:10.1f} ms")
+    print(f"vectorized:  {vectorized_seconds * 1000:10.1f} ms")
+    print(f"speedup:     {naive_seconds / vectorized_seconds:10.1f}x")
+
+    bench_load(args.url, args.db_rows, args.window)
+
+
+if __name__ == "__main__":
+    main()
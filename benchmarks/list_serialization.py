@@ -0,0 +1,91 @@
+"""
+Compara a serializacao de uma listagem grande de energia: o caminho antigo
+(objetos ORM, EnergyResponse.from_orm por linha e JSONResponse) com o atual
+(SELECT Core das colunas do schema, dicts e ORJSONResponse).
+
+Uso:
+    python -m benchmarks.list_serialization --rows 100000
+    python -m benchmarks.list_serialization --url postgresql://... --rows 100000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.serialization import response_statement, rows_as_dicts
+from app.models.energy import Energy
+from app.schemas.energy import EnergyResponse
+
+
+def seed(session, rows: int) -> None:
+    start = datetime(2025, 1, 1)
+    session.bulk_insert_mappings(
+        Energy,
+        [
+            {
+                "energy_generated": random.uniform(0, 10),
+                "energy_consumed": random.uniform(0, 10),
+                "energy_stored": random.uniform(0, 10),
+                "energy_origin": {"solar": random.uniform(0, 5), "grid": random.uniform(0, 5)},
+                "created_at": start + timedelta(seconds=index * 5),
+            }
+            for index in range(rows)
+        ],
+    )
+    session.commit()
+
+
+def orm_path(session, rows: int) -> bytes:
+    energies = session.scalars(select(Energy).order_by(Energy.created_at, Energy.id).limit(rows)).all()
+    payload = [EnergyResponse.from_orm(energy) for energy in energies]
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def core_path(session, rows: int) -> bytes:
+    statement, names = response_statement(Energy, EnergyResponse)
+    result = session.execute(statement.order_by(Energy.created_at, Energy.id).limit(rows)).all()
+    return ORJSONResponse(content=rows_as_dicts(result, names)).body
+
+
+def timed(fn, *args, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(fn(*args))
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite://", help="URL do banco (padrao: SQLite em memoria)")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Energy.__table__.create(engine, checkfirst=True)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        if session.query(Energy).count() < args.rows:
+            seed(session, args.rows)
+
+    with Session() as session:
+        orm_ms, orm_size = timed(orm_path, session, args.rows, repeat=args.repeat)
+        session.expunge_all()
+        core_ms, core_size = timed(core_path, session, args.rows, repeat=args.repeat)
+
+    print(f"linhas: {args.rows}")
+    print(f"ORM + from_orm + JSONResponse:  {orm_ms:9.1f} ms  ({orm_size} bytes)")
+    print(f"Core + dicts + ORJSONResponse:  {core_ms:9.1f} ms  ({core_size} bytes)")
+    print(f"ganho: {orm_ms / core_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
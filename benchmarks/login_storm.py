@@ -0,0 +1,154 @@
+"""
+Mede a latencia de um endpoint leve enquanto uma rajada de logins roda no mesmo worker.
+
+Compara tres fases no mesmo processo e no mesmo event loop: sem logins, com logins no
+caminho antigo (PBKDF2 sincrono dentro do handler async, verificado duas vezes) e com
+logins no caminho atual (/users/login, hash no pool limitado de password_hasher).
+
+Uso:
+    python -m benchmarks.login_storm
+    python -m benchmarks.login_storm --logins 32 --duration 5 --probe-path /energy/
+    PASSWORD_HASH_WORKERS=2 PASSWORD_HASH_MAX_QUEUE=16 python -m benchmarks.login_storm
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import Base, DualWriteSession, get_db
+from app.core.security import password_hasher, verify_password
+from app.crud.user import CRUDUser
+from app.main import create_app
+from app.schemas.user import UserCreate, UserLogin
+
+EMAIL = "storm@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+def build_app(url: str):
+    if url.startswith("sqlite"):
+        # Uma conexao compartilhada: o banco em memoria so existe nela
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    def bench_db():
+        db = DualWriteSession(primary=session_factory(), secondary=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    seed_db = next(bench_db())
+    CRUDUser.create_user(
+        seed_db, UserCreate(name="Storm", lastname="Bench", email=EMAIL, building="B1", password=PASSWORD)
+    )
+    seed_db.close()
+
+    application = create_app(["energy", "users", "logs"])
+    application.dependency_overrides[get_db] = bench_db
+
+    # Handler de login como era antes: PBKDF2 sincrono no event loop, duas vezes por login
+    @application.post("/bench/login_inline")
+    async def login_inline(data: UserLogin, db=Depends(get_db)):
+        user = CRUDUser.get_user_by_email(db, data.email)
+        if not user or not verify_password(data.password, user.password):
+            raise HTTPException(status_code=401)
+        if not verify_password(data.password, user.password):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    return application
+
+
+async def _probe(client: httpx.AsyncClient, path: str, duration: float, interval: float) -> list:
+    # Latencia contada a partir do horario agendado do probe, nao de quando o loop conseguiu
+    # envia-lo: com o loop travado o atraso de agendamento e justamente o que se quer medir.
+    latencies = []
+    started = time.perf_counter()
+    scheduled = started
+    while scheduled < started + duration:
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - scheduled)
+        scheduled = max(scheduled + interval, time.perf_counter() - interval)
+    return latencies
+
+
+async def _login_loop(client: httpx.AsyncClient, path: str, stop: asyncio.Event, counts: dict) -> None:
+    while not stop.is_set():
+        response = await client.post(path, json={"email": EMAIL, "password": PASSWORD})
+        key = "ok" if response.status_code == 200 else str(response.status_code)
+        counts[key] = counts.get(key, 0) + 1
+
+
+async def phase(client, probe_path: str, login_path, logins: int, duration: float, interval: float) -> dict:
+    stop = asyncio.Event()
+    counts = {}
+    storm = [
+        asyncio.create_task(_login_loop(client, login_path, stop, counts)) for _ in range(logins if login_path else 0)
+    ]
+    latencies = await _probe(client, probe_path, duration, interval)
+    stop.set()
+    await asyncio.gather(*storm)
+    latencies.sort()
+    return {
+        "probes": len(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "logins_per_s": counts.get("ok", 0) / duration,
+        "rejected": sum(value for key, value in counts.items() if key != "ok"),
+    }
+
+
+async def run(args) -> None:
+    application = build_app(args.url)
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await client.get(args.probe_path)
+        results = [
+            ("sem logins", await phase(client, args.probe_path, None, 0, args.duration, args.interval)),
+            (
+                "logins no event loop (antigo)",
+                await phase(client, args.probe_path, "/bench/login_inline", args.logins, args.duration, args.interval),
+            ),
+            (
+                "logins no pool (atual)",
+                await phase(client, args.probe_path, "/users/login", args.logins, args.duration, args.interval),
+            ),
+        ]
+
+    print(f"probe {args.probe_path}, {args.logins} logins concorrentes, {args.duration:.0f}s por fase, "
+          f"pool {password_hasher.max_workers} threads / fila {password_hasher.max_queue}")
+    print(f"{'fase':32} {'probes':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'logins/s':>9} {'503':>5}")
+    for name, result in results:
+        print(
+            f"{name:32} {result['probes']:7d} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} "
+            f"{result['max_ms']:8.1f} {result['logins_per_s']:9.1f} {result['rejected']:5d}"
+        )
+    print(f"\npassword_hasher: {password_hasher.status()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite://", help="URL do banco (padrao: SQLite em memoria)")
+    parser.add_argument("--probe-path", default="/energy/")
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=0.01, help="pausa entre probes, em segundos")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
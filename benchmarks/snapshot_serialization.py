@@ -0,0 +1,117 @@
+"""
+Compara o snapshot de um commit do DualWriteSession (serializacao de cada objeto
+pendente para a replica/fila offline) percorrendo mapper.columns com testes de tipo
+por atributo, como antes, e com os planos pre-compilados por modelo.
+
+Usa Maintenance, o modelo mais largo (enums, datas e campos opcionais).
+
+Uso:
+    python -m benchmarks.snapshot_serialization --objects 10000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    _model_key,
+    _pk_values_from_instance,
+    _refresh_operations_from_source,
+    _serialize_for_column,
+    _snapshot_operations,
+)
+from app.models.maintenance import Maintenance
+from app.schemas.maintenance import MaintenanceStatus, MaintenanceType
+
+
+def legacy_snapshot(session) -> list:
+    operations = []
+    for obj in list(session.new) + list(session.dirty):
+        mapper = inspect(obj).mapper
+        payload = {
+            col.key: _serialize_for_column(getattr(obj, col.key), col)
+            for col in mapper.columns
+        }
+        operations.append(
+            {
+                "operation": "upsert",
+                "model_class": obj.__class__,
+                "model_key": _model_key(obj.__class__),
+                "pk_values": _pk_values_from_instance(obj, mapper),
+                "payload": payload,
+                "source_obj": obj,
+            }
+        )
+    return operations
+
+
+def legacy_refresh(operations) -> None:
+    for op in operations:
+        source_obj = op["source_obj"]
+        mapper = inspect(source_obj).mapper
+        op["pk_values"] = _pk_values_from_instance(source_obj, mapper)
+        op["payload"] = {
+            col.key: _serialize_for_column(getattr(source_obj, col.key), col)
+            for col in mapper.columns
+        }
+
+
+def build_session(objects: int) -> Session:
+    session = Session()
+    now = datetime(2026, 1, 1)
+    types, statuses = list(MaintenanceType), list(MaintenanceStatus)
+    session.add_all(
+        Maintenance(
+            id=index,
+            component_id=index % 50,
+            maintenance_type=types[index % len(types)],
+            scheduled_date=now + timedelta(days=index % 90),
+            completed_at=now if index % 3 else None,
+            notes="revisao periodica",
+            status=statuses[index % len(statuses)],
+            operating_hours=index,
+            total_trips=index * 3,
+            last_maintenance_date=now,
+            next_maintenance_date=now + timedelta(days=30),
+            reliability_percent=97.5,
+            is_overdue=bool(index % 2),
+            created_at=now,
+        )
+        for index in range(1, objects + 1)
+    )
+    return session
+
+
+def timed(snapshot, refresh, session, repeat: int) -> tuple[float, list]:
+    best, operations = float("inf"), []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operations = snapshot(session)
+        refresh(operations)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, operations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    session = build_session(args.objects)
+    legacy_ms, legacy_ops = timed(legacy_snapshot, legacy_refresh, session, args.repeat)
+    plan_ms, plan_ops = timed(_snapshot_operations, _refresh_operations_from_source, session, args.repeat)
+
+    by_pk = {tuple(op["pk_values"]): op["payload"] for op in legacy_ops}
+    assert all(by_pk[tuple(op["pk_values"])] == op["payload"] for op in plan_ops), "payloads divergentes"
+
+    print(f"objetos Maintenance: {args.objects}")
+    print(f"mapper.columns por atributo: {legacy_ms:8.1f} ms  ({legacy_ms * 1000 / args.objects:.1f} us/objeto)")
+    print(f"plano por modelo:            {plan_ms:8.1f} ms  ({plan_ms * 1000 / args.objects:.1f} us/objeto)")
+    print(f"ganho: {legacy_ms / plan_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
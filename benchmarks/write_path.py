@@ -0,0 +1,108 @@
+"""
+Compara o caminho de escrita antigo com o atual, gravando leituras de energia uma a uma.
+
+Fase "antes": o mapper com eager_defaults no padrao do SQLAlchemy ("auto"), snapshot do
+DualWriteSession, commit, re-serializacao e db.refresh, como era antes da mudanca.
+Fase "atual": eager_defaults=True (id e created_at voltam no INSERT ... RETURNING),
+sem refresh e sem snapshot quando nao ha banco local.
+
+Uso:
+    python -m benchmarks.write_path --writes 5000
+    python -m benchmarks.write_path --url postgresql://... --writes 5000
+"""
+import argparse
+import statistics
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import DualWriteSession, _refresh_operations_from_source, _snapshot_operations
+from app.models.energy import Energy, EnergyOriginReading
+from app.schemas.energy import EnergyResponse
+
+
+@contextmanager
+def mapper_defaults(eager_defaults):
+    mapper = Energy.__mapper__
+    current = mapper.eager_defaults
+    mapper.eager_defaults = eager_defaults
+    try:
+        yield
+    finally:
+        mapper.eager_defaults = current
+
+
+def legacy_write(db: DualWriteSession, index: int) -> EnergyResponse:
+    energy = Energy(energy_generated=index, energy_consumed=index, energy_stored=index, energy_origin={"solar": 1.0})
+    db.add(energy)
+    operations = _snapshot_operations(db.primary)
+    db.primary.commit()
+    _refresh_operations_from_source(operations)
+    db.refresh(energy)
+    return EnergyResponse.from_orm(energy)
+
+
+def returning_write(db: DualWriteSession, index: int) -> EnergyResponse:
+    energy = Energy(energy_generated=index, energy_consumed=index, energy_stored=index, energy_origin={"solar": 1.0})
+    db.add(energy)
+    db.commit()
+    return EnergyResponse.from_orm(energy)
+
+
+def run(Session, write, writes: int, statements: list) -> dict:
+    latencies = []
+    statements.clear()
+    db = DualWriteSession(primary=Session())
+    try:
+        started = time.perf_counter()
+        for index in range(writes):
+            before = time.perf_counter()
+            write(db, index)
+            latencies.append((time.perf_counter() - before) * 1000)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "throughput": writes / elapsed,
+        "statements": len(statements) / writes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite://", help="URL do banco (padrao: SQLite em memoria)")
+    parser.add_argument("--writes", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    # Cada leitura tambem grava as linhas por fonte (listener after_flush de app.models.energy)
+    for table in (Energy.__table__, EnergyOriginReading.__table__):
+        table.create(engine, checkfirst=True)
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    phases = (
+        ("antes: commit + refresh", "auto", legacy_write),
+        ("atual: RETURNING", True, returning_write),
+    )
+    for label, eager_defaults, write in phases:
+        with mapper_defaults(eager_defaults):
+            result = run(Session, write, args.writes, statements)
+        print(
+            f"{label:<24} p50 {result['p50']:.3f} ms  p95 {result['p95']:.3f} ms  "
+            f"{result['throughput']:8.0f} escritas/s  {result['statements']:.1f} comandos/escrita"
+        )
+
+
+if __name__ == "__main__":
+    main()
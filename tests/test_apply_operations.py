@@ -0,0 +1,64 @@
+from sqlalchemy import Column, Float, Integer, String, create_engine, event, select
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import config
+
+# Base propria: os modelos do app so tem chave simples e o create_all do app nao deve ver esta tabela
+TestBase = declarative_base()
+
+
+class SiteReading(TestBase):
+    __tablename__ = "site_readings"
+
+    site = Column(String(20), primary_key=True)
+    slot = Column(Integer, primary_key=True)
+    value = Column(Float, nullable=False)
+
+
+def _upsert(site, slot, value):
+    return {
+        "operation": "upsert",
+        "model_class": SiteReading,
+        "model_key": config._model_key(SiteReading),
+        "pk_values": [site, slot],
+        "payload": {"site": site, "slot": slot, "value": value},
+        "source_obj": None,
+    }
+
+
+def test_prefetch_chunks_composite_keys_and_applies_mixed_batch(monkeypatch):
+    monkeypatch.setattr(config, "PREFETCH_CHUNK_SIZE", 3)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    TestBase.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    seed = Session()
+    seed.add_all(SiteReading(site=site, slot=slot, value=0.0) for site in ("a", "b") for slot in range(4))
+    seed.commit()
+    seed.close()
+
+    # 8 linhas existentes atualizadas (mesmo slot em sites diferentes) e 3 novas: 11 chaves, 4 blocos
+    operations = [_upsert(site, slot, 1.0) for site in ("a", "b") for slot in range(4)]
+    operations += [_upsert("c", slot, 2.0) for slot in range(3)]
+
+    selects = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_select(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT"):
+            selects.append(parameters)
+
+    session = Session()
+    existing = config._prefetch_existing(session, operations)
+    assert len(existing) == 8
+    assert all(isinstance(key[1], tuple) for key in existing)
+    assert len(selects) == 4
+
+    config._apply_operations(session, operations)
+    session.close()
+
+    rows = Session().execute(select(SiteReading.site, SiteReading.slot, SiteReading.value)).all()
+    assert sorted(rows) == sorted(
+        [(site, slot, 1.0) for site in ("a", "b") for slot in range(4)] + [("c", slot, 2.0) for slot in range(3)]
+    )
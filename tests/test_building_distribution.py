@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import Base, DualWriteSession
+from app.crud.building import BuildingCRUD, derive_energy_kpis
+from app.models.building import BuildingEnergyDistributionDaily
+from app.schemas.energy import BuildingEnergyCreate
+
+
+def _session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return DualWriteSession(sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)(), None)
+
+
+def test_surplus_is_compared_with_the_elapsed_part_of_the_average_day():
+    kpis = derive_energy_kpis(5.0, [20.0, 20.0], 0.0, 0, day_fraction=0.25)
+    assert kpis["surplus_vs_daily_avg_percent"] == 0.0
+    assert derive_energy_kpis(5.0, [20.0, 20.0], 0.0, 0)["surplus_vs_daily_avg_percent"] == -75.0
+
+
+def test_distribution_totals_commit_with_the_record_and_rebuild():
+    db = _session()
+    for supplied in (2.0, 3.0):
+        BuildingCRUD.create_building_energy(db, BuildingEnergyCreate(supplied_energy=supplied, main_destination="A"))
+
+    totals = db.query(BuildingEnergyDistributionDaily.supplied_kwh, BuildingEnergyDistributionDaily.deliveries)
+    assert totals.all() == [(5.0, 2)]
+
+    db.query(BuildingEnergyDistributionDaily).update({"supplied_kwh": 0.0, "deliveries": 0})
+    db.commit()
+    now = datetime.now(timezone.utc)
+    assert BuildingCRUD.rebuild_distribution(db, now - timedelta(days=1), now) == 2
+    assert totals.all() == [(5.0, 2)]
+    db.close()
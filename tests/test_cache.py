@@ -0,0 +1,23 @@
+from app.core.cache import TTLCache
+
+
+def test_load_that_races_an_invalidation_is_not_cached():
+    cache = TTLCache("test", maxsize=10, ttl=60)
+
+    def load():
+        # Uma escrita concorrente invalida a chave enquanto o valor antigo e carregado
+        cache.invalidate("user@example.com")
+        return "stale"
+
+    assert cache.get_or_set("user@example.com", load) == "stale"
+    assert cache.get("user@example.com") is None
+    assert cache.stats()["stale_sets"] == 1
+
+
+def test_set_without_concurrent_invalidation_is_cached():
+    cache = TTLCache("test", maxsize=10, ttl=60)
+    generation = cache.generation()
+    assert cache.set("key", "value", generation)
+    assert cache.get("key") == "value"
+    assert cache.get_or_set("other", lambda: 1) == 1
+    assert cache.get("other") == 1
@@ -0,0 +1,52 @@
+import sqlite3
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import config
+from app.core.config import Base, DualWriteSession, sync_queue
+from app.crud.energy import EnergyCRUD
+from app.models.energy import Energy, EnergyOriginReading
+from app.schemas.energy import EnergyCreate
+
+
+def _sqlite_sessions():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        config._ensure_sync_queue_table(conn)
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def _unreachable_sessions():
+    def refuse():
+        raise sqlite3.OperationalError("connection refused")
+
+    engine = create_engine("sqlite://", creator=refuse)
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def test_energy_with_origins_falls_back_and_replays_with_primary_down(monkeypatch):
+    monkeypatch.setattr(config, "replicator", None)
+    monkeypatch.setattr(config, "SYNC_QUEUE_DRAIN_IN_REQUEST", False)
+    local = _sqlite_sessions()
+    reading = {"energy_generated": 5, "energy_consumed": 2, "energy_stored": 1, "energy_origin": {"solar": 4, "grid": 1}}
+
+    db = DualWriteSession(_unreachable_sessions()(), local())
+    EnergyCRUD.create_energy(db, EnergyCreate(**reading))
+    bulk = EnergyCRUD.create_energy_bulk(db, [reading, reading])
+    db.close()
+    assert bulk.inserted == 2
+
+    secondary = local()
+    assert secondary.scalar(select(func.count()).select_from(Energy)) == 3
+    origin = secondary.execute(select(EnergyOriginReading.energy_id, EnergyOriginReading.source)).all()
+    assert sorted(origin) == [(1, "grid"), (1, "solar"), (2, "grid"), (2, "solar"), (3, "grid"), (3, "solar")]
+    assert set(secondary.scalars(select(sync_queue.c.model_key))) == {config._model_key(Energy)}
+
+    # Replay no principal de volta: as linhas por fonte sao derivadas la tambem
+    primary = _sqlite_sessions()()
+    config._drain_sync_queue(primary, secondary)
+    assert primary.scalar(select(func.count()).select_from(EnergyOriginReading)) == 6
+    assert secondary.scalar(select(func.count()).where(sync_queue.c.synced_at.is_(None))) == 0
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+from app.core.executor import BoundedExecutor, ExecutorSaturated
+
+
+def test_cancelled_queued_tasks_release_their_slots():
+    executor = BoundedExecutor("test", 1, 2)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.create_task(executor.run(release.wait))
+        queued = [asyncio.create_task(executor.run(lambda: None)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.status()["pending"] == 3
+
+        for task in queued:
+            task.cancel()
+        await asyncio.gather(*queued, return_exceptions=True)
+        release.set()
+        await running
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    assert executor.status()["pending"] == 0
+
+
+def test_full_queue_rejects_and_recovers():
+    executor = BoundedExecutor("test", 1, 0)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        try:
+            await executor.run(lambda: None)
+        except ExecutorSaturated:
+            pass
+        else:
+            raise AssertionError("expected ExecutorSaturated")
+        release.set()
+        await running
+        assert await executor.run(lambda: 42) == 42
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    assert executor.status()["rejected"] == 1
+    assert executor.status()["pending"] == 0
@@ -0,0 +1,57 @@
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import config
+from app.core.config import Base, DualWriteSession, sync_queue
+from app.core.replication import BackgroundReplicator
+from app.models.energy import Energy
+
+
+def _sqlite_sessions():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        config._ensure_sync_queue_table(conn)
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def test_full_queue_waits_instead_of_applying_out_of_order():
+    applied = []
+
+    def apply_batch(operations):
+        time.sleep(0.02)
+        applied.extend(op["seq"] for op in operations)
+
+    replicator = BackgroundReplicator(
+        "test", apply_batch, maxsize=1, batch_size=1, enqueue_timeout=0.001, lag_warning_seconds=60
+    )
+    for seq in range(10):
+        replicator.submit([{"seq": seq, "source_obj": object()}])
+
+    assert replicator.flush(timeout=5)
+    replicator.stop()
+    assert applied == list(range(10))
+    assert replicator.status()["backpressure_waits"] > 0
+
+
+def test_replicator_failure_after_primary_commit_is_not_queued_offline(monkeypatch):
+    class BrokenReplicator:
+        def submit(self, operations):
+            raise RuntimeError("replication queue closed")
+
+        def flush(self, timeout=None):
+            return True
+
+    monkeypatch.setattr(config, "replicator", BrokenReplicator())
+    primary, local = _sqlite_sessions(), _sqlite_sessions()
+
+    db = DualWriteSession(primary(), local())
+    db.add(Energy(energy_generated=1, energy_consumed=1, energy_stored=1, energy_origin={}))
+    db.commit()
+    db.close()
+
+    assert primary().scalar(select(func.count()).select_from(Energy)) == 1
+    assert local().scalar(select(func.count()).select_from(sync_queue)) == 0
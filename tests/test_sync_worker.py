@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import config, sync_worker
+from app.core.config import Base
+from app.models.energy import Energy, EnergyOriginReading
+
+CREATED_AT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _primary_with_foreign_keys():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    @event.listens_for(engine, "connect")
+    def _enable_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+
+
+def _energy(energy_id, generated=1.0):
+    return Energy(
+        id=energy_id,
+        energy_generated=generated,
+        energy_consumed=1.0,
+        energy_stored=1.0,
+        energy_origin={"solar": generated},
+        created_at=CREATED_AT,
+    )
+
+
+def _origin(origin_id, energy_id):
+    return EnergyOriginReading(id=origin_id, energy_id=energy_id, source="solar", amount=1.0, created_at=CREATED_AT)
+
+
+def _row(queue_id, operation, obj):
+    plan = config._mapper_plan(type(obj))
+    return {
+        "id": queue_id,
+        "model_key": plan.model_key,
+        "operation": operation,
+        "pk_values": plan.pk_values(obj),
+        "payload": plan.serialize(obj) if operation == "upsert" else None,
+    }
+
+
+def test_coalesce_keeps_last_state_and_every_queue_id():
+    rows = [
+        _row(1, "upsert", _energy(1, generated=1.0)),
+        _row(2, "upsert", _energy(2)),
+        _row(3, "upsert", _energy(1, generated=7.0)),
+    ]
+
+    operations = sync_worker._coalesce(rows)
+
+    assert [(op[0], op[2], op[4]) for op in operations] == [(Energy, [1], [1, 3]), (Energy, [2], [2])]
+    assert operations[0][3]["energy_generated"] == 7.0
+
+
+def test_delete_after_upsert_coalesces_to_delete():
+    primary = _primary_with_foreign_keys()
+    primary.add(_energy(1))
+    primary.commit()
+
+    operations = sync_worker._coalesce([_row(1, "upsert", _energy(1, generated=3.0)), _row(2, "delete", _energy(1))])
+    assert [(op[1], op[4]) for op in operations] == [("delete", [1, 2])]
+
+    sync_worker._replay(primary, operations)
+    primary.commit()
+    assert primary.scalar(select(Energy.id)) is None
+
+
+def test_replay_orders_models_by_foreign_keys_not_queue_order():
+    primary = _primary_with_foreign_keys()
+    primary.add_all([_energy(1), _origin(10, 1)])
+    primary.commit()
+
+    # Filho antes do pai no lote: o upsert do pai 2 chega depois da leitura por fonte que aponta
+    # para ele, e o delete do pai 1 chega antes do delete do filho
+    rows = [
+        _row(1, "upsert", _origin(11, 2)),
+        _row(2, "delete", _energy(1)),
+        _row(3, "upsert", _energy(2)),
+        _row(4, "delete", _origin(10, 1)),
+    ]
+    sync_worker._replay(primary, sync_worker._coalesce(rows))
+    primary.commit()
+
+    assert primary.scalars(select(Energy.id)).all() == [2]
+    assert primary.execute(select(EnergyOriginReading.id, EnergyOriginReading.energy_id)).all() == [(11, 2)]